@@ -0,0 +1,3 @@
+from .cache import CompilationCache  # noqa
+from .literal_pool import LiteralPool  # noqa
+from .parallel import compile_functions  # noqa
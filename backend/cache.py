@@ -0,0 +1,84 @@
+import contextlib
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Optional
+
+from c_token import Function, structural_hash
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompilationCache():
+    # compiled output per function on disk, keyed by structural hash of the
+    # function and by salt describing the compiler (version, options), which
+    # the caller has to bump whenever codegen or passes or anything they call
+    # change. Last access time is the file mtime, oldest entries are evicted first
+    def __init__(self, directory: str, salt: str, max_entries: int = 10_000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, function: Function, context: str = '') -> str:
+        return hashlib.blake2b(
+            f'{self.salt}\0{context}\0{structural_hash(function)}'.encode(), digest_size=16
+        ).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # truncated file, class that moved since it was written, etc.
+            value = None
+        if not (isinstance(value, tuple) and len(value) == 1):
+            logger.warning('Dropping corrupted cache entry %s', path)
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+            self.misses += 1
+            return None
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        self.hits += 1
+        # values are wrapped, so cached None is not taken for a miss
+        return value[0]
+
+    def put(self, key: str, value: Any):
+        # write and rename, so concurrent builds never see half written entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                pickle.dump((value,), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temporary)
+            raise
+
+    def evict(self):
+        entries = []
+        with os.scandir(self.directory) as iterator:
+            for entry in iterator:
+                if entry.is_file() and not entry.name.startswith('.tmp-'):
+                    with contextlib.suppress(FileNotFoundError):
+                        entries.append((entry.stat().st_mtime_ns, entry.path))
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+        logger.info('Evicted %d cache entries', len(entries) - self.max_entries)
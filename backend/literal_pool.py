@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import struct
+
+from c_token import Constant, Token, ValType
+
+
+logger = logging.getLogger(__name__)
+
+
+def _string_content(value: str) -> str:
+    # lexer keeps the quotes, escapes are not supported so they are just stripped
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def _escape(data: bytes) -> str:
+    result = []
+    for byte in data:
+        if byte in (ord('"'), ord('\\')):
+            result.append('\\' + chr(byte))
+        elif 0x20 <= byte < 0x7f:
+            result.append(chr(byte))
+        else:
+            result.append(f'\\{byte:03o}')
+    return ''.join(result)
+
+
+class LiteralPool():
+    # Program wide pool of string and float constants for the read-only data
+    # section. Labels depend only on the value, so output of one function
+    # doesn't change when literals of other functions do (see CompilationCache)
+    def __init__(self):
+        self.strings: dict[bytes, str] = {}
+        self.floats: dict[bytes, str] = {}
+
+    def add(self, constant: Constant) -> str:
+        if constant.type == ValType.STRING:
+            data = _string_content(constant.value).encode()
+            label = self.strings.get(data)
+            if label is None:
+                digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+                label = self.strings[data] = f'.Lstr_{digest}'
+            return label
+        if constant.type == ValType.FLOAT:
+            # bit pattern, so 0.0 and -0.0 stay different
+            data = struct.pack('>d', float(constant.value))
+            label = self.floats.get(data)
+            if label is None:
+                label = self.floats[data] = f'.Lflt_{data.hex()}'
+            return label
+        raise ValueError(f'Constant of type {constant.type} doesn\'t go to literal pool')
+
+    def collect(self, tokens: list[Token]) -> dict[int, str]:
+        # id(constant) -> label for every pooled constant in trees
+        result: dict[int, str] = {}
+        stack = list(tokens)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Constant) and node.type in (ValType.STRING, ValType.FLOAT):
+                result[id(node)] = self.add(node)
+            stack.extend(node.children())
+        return result
+
+    def _merge_suffixes(self) -> dict[bytes, tuple[bytes, int]]:
+        # string -> (string holding it, offset), strings sharing a tail share
+        # the terminating zero too, so "abc" can point into "xabc".
+        # Sorted by reversed content each string is followed by ones ending with it
+        ordered = sorted(self.strings, key=lambda data: data[::-1])
+        result: dict[bytes, tuple[bytes, int]] = {}
+        owner = None
+        for data in reversed(ordered):
+            if owner is not None and owner.endswith(data):
+                result[data] = (owner, len(owner) - len(data))
+            else:
+                owner = data
+                result[data] = (data, 0)
+        return result
+
+    def emit(self) -> str:
+        lines = ['    .section .rodata']
+        if self.floats:
+            lines.append('    .balign 8')
+            for data, label in sorted(self.floats.items(), key=lambda item: item[1]):
+                lines.append(f'{label}:')
+                lines.append(f'    .quad 0x{data.hex()}')
+
+        merged = self._merge_suffixes()
+        owners = sorted(
+            (label, data) for data, label in self.strings.items() if merged[data][0] == data
+        )
+        for label, data in owners:
+            lines.append(f'{label}:')
+            lines.append(f'    .string "{_escape(data)}"')
+        aliases = sorted(
+            (label, self.strings[merged[data][0]], merged[data][1])
+            for data, label in self.strings.items() if merged[data][0] != data
+        )
+        for label, owner_label, offset in aliases:
+            lines.append(f'    .set {label}, {owner_label} + {offset}')
+        logger.info(
+            '%d strings in %d blobs, %d floats', len(self.strings), len(owners), len(self.floats)
+        )
+        return '\n'.join(lines) + '\n'
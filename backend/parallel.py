@@ -0,0 +1,118 @@
+import concurrent.futures
+import hashlib
+import logging
+import os
+import types
+from typing import Callable, Optional, Sequence, TypeVar
+
+from c_token import Function, deserialize, serialize
+
+from .cache import CompilationCache
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# each worker gets several chunks so a few heavy functions don't leave others idle
+_chunks_per_worker = 4
+
+
+def _compile_chunk(
+    codegen: Callable[[Function], T],
+    passes: Sequence[Callable[[Function], Function]],
+    chunk: list[tuple],
+) -> list[T]:
+    result = []
+    for data in chunk:
+        function = deserialize(data)
+        for optimization in passes:
+            function = optimization(function)
+        result.append(codegen(function))
+    return result
+
+
+def _code_digest(code: types.CodeType) -> str:
+    # bytecode, names and constants, but not line numbers, so editing a
+    # function body changes it and moving the function around doesn't
+    digest = hashlib.blake2b(code.co_code, digest_size=8)
+    digest.update(repr(code.co_names).encode())
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            digest.update(_code_digest(constant).encode())
+        else:
+            digest.update(repr(constant).encode())
+    return digest.hexdigest()
+
+
+def _describe(func: Callable) -> str:
+    # part of the cache key standing for one codegen or pass
+    name = f'{func.__module__}.{func.__qualname__}'
+    if '<lambda>' in name:
+        raise ValueError(f'{name} can\'t be cached, all lambdas of a module share one name')
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return name
+    return f'{name}@{_code_digest(code)}'
+
+
+def compile_functions(
+    functions: list[Function],
+    codegen: Callable[[Function], T],
+    passes: Sequence[Callable[[Function], Function]] = (),
+    workers: Optional[int] = None,
+    cache: Optional[CompilationCache] = None,
+) -> list[T]:
+    # functions must be independent, i.e. semantic analysis and inlining are
+    # already done; codegen and passes must be picklable module level callables.
+    # Output goes in the same order as input functions whatever the scheduling
+    if cache is None:
+        return _compile(functions, codegen, passes, workers)
+
+    context = ' '.join(_describe(func) for func in [codegen, *passes])
+    keys = [cache.key(function, context) for function in functions]
+    result: list = [cache.get(key) for key in keys]
+    missing = [index for index, value in enumerate(result) if value is None]
+    logger.info(
+        '%d of %d functions taken from cache', len(functions) - len(missing), len(functions)
+    )
+    compiled = _compile([functions[index] for index in missing], codegen, passes, workers)
+    for index, value in zip(missing, compiled):
+        result[index] = value
+        cache.put(keys[index], value)
+    cache.evict()
+    return result
+
+
+def _compile(
+    functions: list[Function],
+    codegen: Callable[[Function], T],
+    passes: Sequence[Callable[[Function], Function]],
+    workers: Optional[int],
+) -> list[T]:
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(functions) < 2:
+        # same round trip as in workers, so passes never touch caller's trees
+        return _compile_chunk(codegen, passes, [serialize(function) for function in functions])
+
+    # trees go as flat tuples of plain values, pickling them is much cheaper
+    # than pickling the graph of token objects
+    serialized = [serialize(function) for function in functions]
+    chunk_size = max(1, -(-len(serialized) // (workers * _chunks_per_worker)))
+    chunks = [
+        serialized[start:start + chunk_size]
+        for start in range(0, len(serialized), chunk_size)
+    ]
+    logger.info(
+        'Compiling %d functions in %d chunks on %d workers', len(functions), len(chunks), workers
+    )
+    result: list[T] = []
+    with concurrent.futures.ProcessPoolExecutor(min(workers, len(chunks))) as executor:
+        for chunk_result in executor.map(
+            _compile_chunk,
+            [codegen] * len(chunks),
+            [passes] * len(chunks),
+            chunks,
+        ):
+            result.extend(chunk_result)
+    return result
@@ -0,0 +1,99 @@
+import os
+import pickle
+
+import pytest
+
+from c_token import Constant, Function, Return, ValType, Variable, structural_hash
+
+from ..cache import CompilationCache
+from ..parallel import compile_functions
+
+
+def _function(name, value, line=1):
+    return Function(
+        (line, 1), ['int'], name, [Variable((line, 2), 'a', ['int'])],
+        [Return((line, 3), Constant((line, 4), ValType.INT, value))]
+    )
+
+
+calls = []
+
+
+def _codegen(function):
+    calls.append(function.name)
+    return f'{function.name} returns {function.body[0].value.value}'
+
+
+def test_token_eq():
+    assert _function('f', 1) == _function('f', 1, line=10)
+    assert _function('f', 1) != _function('f', 2)
+    assert _function('f', 1) != _function('g', 1)
+    assert Constant((1, 1), ValType.INT, 1) != Constant((1, 1), ValType.CHAR, 1)
+    assert Constant((1, 1), ValType.INT, 1) != Variable((1, 1), 'a', ['int'])
+
+
+def test_structural_hash():
+    assert structural_hash(_function('f', 1)) == structural_hash(_function('f', 1, line=10))
+    assert structural_hash(_function('f', 1)) != structural_hash(_function('f', 2))
+    assert structural_hash(_function('f', 1)) != structural_hash(_function('g', 1))
+    # known value, must not change between runs and interpreter versions
+    assert structural_hash(Constant((1, 1), ValType.INT, 1)) == 'fcef4dbc51108b951c36e0aa3004c382'
+
+
+def test_compile_with_cache(tmp_path):
+    cache = CompilationCache(str(tmp_path), 'test')
+    functions = [_function('f', 1), _function('g', 2)]
+    calls.clear()
+    assert compile_functions(functions, _codegen, workers=1, cache=cache) == [
+        'f returns 1', 'g returns 2'
+    ]
+    assert calls == ['f', 'g']
+
+    calls.clear()
+    functions = [_function('f', 1, line=5), _function('g', 3)]
+    assert compile_functions(functions, _codegen, workers=1, cache=cache) == [
+        'f returns 1', 'g returns 3'
+    ]
+    assert calls == ['g']
+    assert cache.hits == 1
+
+
+def test_eviction(tmp_path):
+    cache = CompilationCache(str(tmp_path), 'test', max_entries=2)
+    keys = [cache.key(_function('f', value)) for value in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, key)
+        os.utime(tmp_path / key, ns=(age * 10**9, age * 10**9))
+    # reading makes entry the most recently used one
+    assert cache.get(keys[0]) == keys[0]
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == sorted([keys[0], keys[2]])
+    assert cache.get(keys[1]) is None
+
+
+def test_corrupted_entries(tmp_path):
+    cache = CompilationCache(str(tmp_path), 'test')
+    key = cache.key(_function('f', 1))
+    for content in (b'garbage', pickle.dumps(1), pickle.dumps((1, 2)), b''):
+        (tmp_path / key).write_bytes(content)
+        assert cache.get(key) is None
+        assert not (tmp_path / key).exists()
+    assert cache.misses == 4
+
+
+def test_cache_key_follows_code(tmp_path):
+    cache = CompilationCache(str(tmp_path), 'test')
+
+    def codegen(function):
+        return 1
+
+    first = codegen
+
+    def codegen(function):
+        return 2
+
+    # same qualified name, different body
+    assert compile_functions([_function('f', 1)], first, workers=1, cache=cache) == [1]
+    assert compile_functions([_function('f', 1)], codegen, workers=1, cache=cache) == [2]
+    with pytest.raises(ValueError):
+        compile_functions([_function('f', 1)], lambda function: 3, workers=1, cache=cache)
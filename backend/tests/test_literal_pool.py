@@ -0,0 +1,72 @@
+import pytest
+
+from c_token import Constant, Function, FunctionCall, Return, ValType, Variable
+
+from ..literal_pool import LiteralPool
+
+
+def _string(value):
+    return Constant((0, 0), ValType.STRING, value)
+
+
+def _float(value):
+    return Constant((0, 0), ValType.FLOAT, value)
+
+
+def test_deduplication():
+    pool = LiteralPool()
+    assert pool.add(_string('"abc"')) == pool.add(_string('"abc"'))
+    assert pool.add(_string('"abc"')) != pool.add(_string('"abd"'))
+    assert pool.add(_float(1.5)) == pool.add(_float('1.5')) == '.Lflt_3ff8000000000000'
+    assert pool.add(_float(0.0)) != pool.add(_float(-0.0))
+    with pytest.raises(ValueError):
+        pool.add(Constant((0, 0), ValType.INT, 1))
+
+
+def test_labels_are_stable():
+    first, second = LiteralPool(), LiteralPool()
+    first.add(_string('"other"'))
+    assert first.add(_string('"abc"')) == second.add(_string('"abc"'))
+
+
+def test_collect():
+    used = [_string('"Factorial of %d = %llu"'), _string('"Factorial of %d = %llu"')]
+    program = [Function((0, 0), ['int'], 'main', [], [
+        Variable((0, 0), 'f', ['float'], _float(1.343)),
+        FunctionCall((0, 0), 'printf', [used[0]]),
+        FunctionCall((0, 0), 'printf', [used[1]]),
+        Return((0, 0), Constant((0, 0), ValType.INT, 0)),
+    ])]
+    pool = LiteralPool()
+    labels = pool.collect(program)
+    assert len(labels) == 3
+    assert labels[id(used[0])] == labels[id(used[1])]
+    assert len(pool.strings) == 1
+
+
+def test_emit_merges_suffixes():
+    pool = LiteralPool()
+    xabc = pool.add(_string('"xabc"'))
+    abc = pool.add(_string('"abc"'))
+    c = pool.add(_string('"c"'))
+    other = pool.add(_string('"a\\"b"'))
+    flt = pool.add(_float(2.0))
+    lines = pool.emit().splitlines()
+    assert lines[:4] == [
+        '    .section .rodata',
+        '    .balign 8',
+        f'{flt}:',
+        '    .quad 0x4000000000000000',
+    ]
+    assert f'{xabc}:' in lines
+    assert f'{abc}:' not in lines
+    assert f'    .set {abc}, {xabc} + 1' in lines
+    assert f'    .set {c}, {xabc} + 3' in lines
+    assert lines[lines.index(f'{other}:') + 1] == '    .string "a\\\\\\"b"'
+
+    # same section whatever order literals were met in
+    reordered = LiteralPool()
+    for value in ('"c"', '"a\\"b"', '"abc"', '"xabc"'):
+        reordered.add(_string(value))
+    reordered.add(_float(2.0))
+    assert reordered.emit() == pool.emit()
@@ -0,0 +1,95 @@
+from c_token import (
+    Constant,
+    ForLoop,
+    Function,
+    FunctionCall,
+    OpArity,
+    Operator,
+    OpType,
+    Return,
+    ValType,
+    Variable,
+    deserialize,
+    serialize,
+)
+
+from ..parallel import compile_functions
+
+
+def _function(index):
+    counter = Variable((index, 2), 'i', ['int'], Constant((index, 3), ValType.INT, 0))
+    return Function(
+        (index, 1), ['int'], f'func_{index}', [Variable((index, 4), 'a', ['char', '*'])],
+        [
+            ForLoop(
+                (index, 5), counter,
+                Variable((index, 6), 'i', ['int']),
+                FunctionCall((index, 7), 'printf', [Constant((index, 8), ValType.STRING, '"x"')]),
+                [],
+            ),
+            Return((index, 9), Operator(
+                (index, 10), OpArity.Binary, OpType.ARRAY_ACC,
+                (
+                    Variable((index, 11), 'a', ['char', '*']),
+                    Constant((index, 12), ValType.INT, index),
+                )
+            )),
+        ]
+    )
+
+
+def _codegen(function):
+    return f'{function.name}:{len(serialize(function))}'
+
+
+def _rename(function):
+    function.name = function.name.upper()
+    return function
+
+
+def test_serialize_round_trip():
+    function = _function(1)
+    data = serialize(function)
+    assert all(isinstance(node, tuple) for node in data)
+    restored = deserialize(data)
+    assert serialize(restored) == data
+    assert restored.body[1].value.type is OpType.ARRAY_ACC
+    assert restored.body[1].value.args[1].value == 1
+    assert restored.body[0].body == []
+
+    # shared subtrees stay shared
+    shared = Constant((1, 1), ValType.INT, 2)
+    operator = Operator((1, 2), OpArity.Binary, OpType.ADD, (shared, shared))
+    assert len(serialize(operator)) == 2
+    restored = deserialize(serialize(operator))
+    assert restored.args[0] is restored.args[1]
+
+
+def test_compile_functions_order():
+    functions = [_function(index) for index in range(50)]
+    expected = [_codegen(function) for function in functions]
+    assert compile_functions(functions, _codegen, workers=1) == expected
+    assert compile_functions(functions, _codegen, workers=3) == expected
+
+
+def test_compile_functions_passes():
+    functions = [_function(index) for index in range(5)]
+    result = compile_functions(functions, _codegen, passes=[_rename], workers=2)
+    assert [line.split(':')[0] for line in result] == [f'FUNC_{index}' for index in range(5)]
+    # caller's trees are left as they were
+    assert functions[0].name == 'func_0'
+
+
+def _mutate(function):
+    function.return_type.append('*')
+    function.body.append(Return((0, 0)))
+    function.args[0].type.append('*')
+    return function
+
+
+def test_passes_dont_touch_caller_trees():
+    function = Function((1, 1), ['int'], 'f', [Variable((1, 2), 'a', ['char'])], [])
+    compile_functions([function], lambda function: function, passes=[_mutate], workers=1)
+    assert function.return_type == ['int']
+    assert function.body == []
+    assert function.args[0].type == ['char']
@@ -0,0 +1 @@
+from .generator import generate_source  # noqa
@@ -0,0 +1,69 @@
+import click
+import json
+import logging
+import sys
+
+from . import runner
+from .generator import generate_source
+
+
+logger = logging.getLogger(__name__)
+
+
+@click.command()
+@click.option('--seed', type=int, default=0, show_default=True)
+@click.option('--size', type=int, default=100_000, show_default=True,
+              help='Approximate size of generated source in bytes')
+@click.option('--depth', type=int, default=3, show_default=True,
+              help='Maximum nesting depth of blocks')
+@click.option('--literal-density', type=float, default=0.3, show_default=True,
+              help='Probability of operand being a literal')
+@click.option('--comment-ratio', type=float, default=0.1, show_default=True,
+              help='Probability of comment before statement')
+@click.option('--repeat', type=int, default=3, show_default=True,
+              help='Runs per stage, best time is reported')
+@click.option('-s', '--stage', 'stages', type=click.Choice(sorted(runner.STAGES)),
+              multiple=True, help='Stages to measure, all by default')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              help='Write results as JSON')
+@click.option('-b', '--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='Compare results with stored baseline')
+@click.option('--threshold', type=float, default=0.1, show_default=True,
+              help='Allowed throughput drop relative to baseline')
+@click.option('-v', '--verbose', count=True)
+def main(
+    seed, size, depth, literal_density, comment_ratio, repeat,
+    stages, output, baseline, threshold, verbose,
+):
+    logging.basicConfig(
+        level=logging.INFO if verbose else logging.WARNING,
+        format='%(asctime)s %(levelname)s %(message)s',
+    )
+    content = generate_source(seed, size, depth, literal_density, comment_ratio)
+    results = {
+        'params': {
+            'seed': seed,
+            'size': size,
+            'depth': depth,
+            'literal_density': literal_density,
+            'comment_ratio': comment_ratio,
+        },
+        'stages': runner.run(content, list(stages or runner.STAGES), repeat),
+    }
+    print(json.dumps(results, indent=4, sort_keys=True))
+    if output:
+        runner.save(output, results)
+
+    if baseline:
+        stored = runner.load(baseline)
+        if stored['params'] != results['params']:
+            logger.warning('Baseline was measured with different params %s', stored['params'])
+        regressions = runner.compare(results['stages'], stored['stages'], threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
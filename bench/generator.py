@@ -0,0 +1,195 @@
+import random
+
+
+_arithmetic_types = [
+    'char',
+    'long long int',
+    'unsigned long long int',
+    'float',
+]
+
+_types = _arithmetic_types + [
+    'char *',
+    'long long int *',
+]
+
+# pointers are not returned, nothing local may be returned by address
+_return_types = _arithmetic_types + ['void']
+
+_words = [
+    'alpha', 'beta', 'gamma', 'delta', 'value', 'count', 'index', 'buffer', 'total', 'item',
+]
+
+
+class SourceGenerator():
+    # generates sources in the dialect described in README, the same seed and
+    # parameters always give the same text. Names are only used in blocks they
+    # are declared in and expressions are typed, so stages after the lexer can
+    # be measured on the same sources. printf is the only undeclared name
+    def __init__(
+        self,
+        seed: int = 0,
+        size: int = 100_000,
+        depth: int = 3,
+        literal_density: float = 0.3,
+        comment_ratio: float = 0.1,
+    ):
+        self.random = random.Random(seed)
+        self.size = size
+        self.depth = depth
+        self.literal_density = literal_density
+        self.comment_ratio = comment_ratio
+        self._lines: list[str] = []
+        self._length = 0
+        # names visible in every open block, innermost last: (name, type)
+        self._scopes: list[list[tuple[str, str]]] = []
+        self._return_type = 'void'
+        self._name_index = 0
+
+    def generate(self) -> str:
+        function_index = 0
+        while self._length < self.size:
+            self._function(function_index)
+            function_index += 1
+        return '\n'.join(self._lines) + '\n'
+
+    def _emit(self, level: int, line: str):
+        line = '    ' * level + line
+        self._lines.append(line)
+        self._length += len(line) + 1
+
+    def _comment(self, level: int):
+        if self.random.random() >= self.comment_ratio:
+            return
+        text = ' '.join(self.random.choices(_words, k=self.random.randint(2, 8)))
+        if self.random.random() < 0.5:
+            self._emit(level, f'// {text}')
+        else:
+            self._emit(level, f'/* {text}')
+            self._emit(level, f'   {text} */')
+
+    def _declare(self, var_type: str) -> str:
+        # index keeps names of one function unique, so nothing is redeclared
+        self._name_index += 1
+        name = f'{self.random.choice(_words)}_{self._name_index}'
+        self._scopes[-1].append((name, var_type))
+        return name
+
+    def _visible(self, types: list[str]) -> list[str]:
+        return [name for scope in self._scopes for name, var_type in scope if var_type in types]
+
+    def _function(self, index: int):
+        self._name_index = 0
+        self._scopes = [[]]
+        self._return_type = self.random.choice(_return_types)
+        args = []
+        for _ in range(self.random.randint(0, 4)):
+            var_type = self.random.choice(_types)
+            args.append(f'{var_type} {self._declare(var_type)}')
+        self._comment(0)
+        self._emit(0, f'{self._return_type} func_{index}({", ".join(args)}) {{')
+        self._body(1, self.random.randint(2, 8))
+        self._emit(0, '}')
+        self._emit(0, '')
+
+    def _body(self, level: int, statements: int):
+        self._scopes.append([])
+        for _ in range(statements):
+            self._comment(level)
+            self._statement(level)
+        self._scopes.pop()
+
+    def _statement(self, level: int):
+        kind = self.random.random()
+        nested = level <= self.depth
+        if nested and kind < 0.15:
+            self._emit(level, f'if ({self._expression(2)} < {self._expression(1)}) {{')
+            self._body(level + 1, self.random.randint(1, 4))
+            self._emit(level, '} else {')
+            self._body(level + 1, self.random.randint(1, 3))
+            self._emit(level, '}')
+        elif nested and kind < 0.25:
+            self._emit(level, f'while ({self._expression(2)}) {{')
+            self._body(level + 1, self.random.randint(1, 4))
+            self._emit(level, '}')
+        elif nested and kind < 0.35:
+            # counter belongs to the loop, not to the enclosing block
+            self._scopes.append([])
+            limit = self._expression(1)
+            counter = self._declare('long long int')
+            self._emit(
+                level,
+                f'for (long long int {counter} = {self._literal()}; {counter} < {limit}; '
+                f'{counter} = {counter} + 1) {{'
+            )
+            self._body(level + 1, self.random.randint(1, 4))
+            self._emit(level, '}')
+            self._scopes.pop()
+        elif kind < 0.7:
+            self._declaration(level)
+        elif kind < 0.8 and self._visible(['char *']) and self._visible(['char']):
+            target = self.random.choice(self._visible(['char *']))
+            value = self.random.choice(self._visible(['char']))
+            self._emit(level, f'{target}[{self._expression(1)}] = *&{value};')
+        elif kind < 0.9:
+            self._emit(level, f'printf({self._string()}, {self._expression(2)});')
+        elif self._return_type == 'void':
+            self._emit(level, 'return;')
+        else:
+            self._emit(level, f'return {self._expression(2)};')
+
+    def _declaration(self, level: int):
+        var_type = self.random.choice(_types)
+        targets = self._visible(['long long int'])
+        if var_type == 'long long int *' and not targets:
+            var_type = 'long long int'
+        if var_type == 'char *':
+            value = self._string()
+        elif var_type == 'long long int *':
+            value = f'&{self.random.choice(targets)}'
+        else:
+            value = self._expression(3)
+        # the value is generated first, a name is not visible in its own initialiser
+        self._emit(level, f'{var_type} {self._declare(var_type)} = {value};')
+
+    def _expression(self, depth: int) -> str:
+        if depth <= 0 or self.random.random() < 0.3:
+            return self._operand()
+        operator = self.random.choice(['+', '-', '*', '/'])
+        left = self._expression(depth - 1)
+        right = self._expression(depth - 1)
+        if self.random.random() < 0.3:
+            return f'({left} {operator} {right})'
+        return f'{left} {operator} {right}'
+
+    def _operand(self) -> str:
+        names = self._visible(_arithmetic_types)
+        if not names or self.random.random() < self.literal_density:
+            return self._literal()
+        return self.random.choice(names)
+
+    def _literal(self) -> str:
+        value = self.random.randint(0, 100_000)
+        return self.random.choice([
+            lambda: str(value + 1),
+            lambda: hex(value),
+            lambda: bin(value),
+            lambda: '0' + oct(value)[2:],
+            lambda: f'{value}.{self.random.randint(0, 99)}',
+            lambda: f'.{value}',
+            lambda: f'{value}.',
+            lambda: f'\'{self.random.choice("abcxyz ")}\'',
+        ])()
+
+    def _string(self) -> str:
+        return '"' + ' '.join(self.random.choices(_words, k=self.random.randint(1, 5))) + '"'
+
+
+def generate_source(
+    seed: int = 0,
+    size: int = 100_000,
+    depth: int = 3,
+    literal_density: float = 0.3,
+    comment_ratio: float = 0.1,
+) -> str:
+    return SourceGenerator(seed, size, depth, literal_density, comment_ratio).generate()
@@ -0,0 +1,94 @@
+import gc
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Sized
+
+from parser import ExtractTokens, Preprocessor
+
+
+logger = logging.getLogger(__name__)
+
+
+def _preprocess(content: str, path: str) -> Sized:
+    return Preprocessor(path).process()
+
+
+# stage name -> function taking source text and path of a file holding it
+# and returning produced tokens, new pipeline stages register themselves
+# here to be measured
+STAGES: dict[str, Callable[[str, str], Sized]] = {
+    'extract': lambda content, path: ExtractTokens(content).extract(),
+    'preprocess': _preprocess,
+}
+
+
+def _peak_kb(stage: Callable[[str, str], Sized], content: str, path: str) -> int:
+    # separate untimed run, tracing slows allocations down a lot.
+    # Peak is counted from the start of the run, so earlier stages don't
+    # leak into it the way process wide ru_maxrss does
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage(content, path)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_stage(name: str, content: str, repeat: int = 3) -> dict:
+    stage = STAGES[name]
+    best = float('inf')
+    tokens = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.c')
+        with open(path, 'w') as f:
+            f.write(content)
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            tokens = len(stage(content, path))
+            best = min(best, time.perf_counter() - start)
+        peak = _peak_kb(stage, content, path)
+    size_mb = len(content.encode()) / 1024 / 1024
+    result = {
+        'seconds': best,
+        'tokens': tokens,
+        'tokens_per_sec': tokens / best,
+        'mb_per_sec': size_mb / best,
+        'peak_alloc_kb': peak,
+    }
+    logger.info('%s: %s', name, result)
+    return result
+
+
+def run(content: str, stages: list[str], repeat: int = 3) -> dict[str, dict]:
+    return {name: run_stage(name, content, repeat) for name in stages}
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]['tokens_per_sec']
+        actual = result['tokens_per_sec']
+        if actual < expected * (1 - threshold):
+            regressions.append(
+                f'{name}: {actual:.0f} tokens/sec, baseline {expected:.0f} '
+                f'({(actual / expected - 1) * 100:+.1f}%)'
+            )
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path: str, data: dict):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4, sort_keys=True)
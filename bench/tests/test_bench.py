@@ -0,0 +1,78 @@
+from parser import ExtractTokens
+from parser.extract_tokens import TokenType
+
+from ..generator import generate_source
+from ..runner import compare, run
+
+
+def test_generator_is_seeded():
+    assert generate_source(1, 5000) == generate_source(1, 5000)
+    assert generate_source(1, 5000) != generate_source(2, 5000)
+    assert len(generate_source(3, 5000)) >= 5000
+
+
+def _check_names(source):
+    # every name is declared in an open block before it's used,
+    # for counters belong to the loop body
+    keywords = {'char', 'long', 'unsigned', 'int', 'float', 'void', 'if', 'else', 'while',
+                'for', 'return', 'printf'}
+    tokens = [
+        token for token in ExtractTokens(source).extract() if token.type != TokenType.COMMENT
+    ]
+    scopes = [set()]
+    loop_scope = False
+    for index, token in enumerate(tokens):
+        if token.data == 'for':
+            scopes.append(set())
+            loop_scope = True
+        elif token.data == '{':
+            if loop_scope:
+                loop_scope = False
+            else:
+                scopes.append(set())
+        elif token.data == '}':
+            scopes.pop()
+        if token.type != TokenType.IDENTIFIER or token.data in keywords:
+            continue
+        if tokens[index + 1].data == '(':
+            # function definition
+            scopes = [set()]
+            continue
+        previous = tokens[index - 1].data
+        if previous in keywords or previous == '*' and tokens[index - 2].data in keywords:
+            scopes[-1].add(token.data)
+        else:
+            assert any(token.data in scope for scope in scopes), token
+
+
+def test_generated_source_is_valid():
+    for seed in range(10):
+        source = generate_source(seed, 5000, depth=4)
+        _check_names(source)
+        void = False
+        for line in source.split('\n'):
+            if line.endswith(') {') and not line.startswith(' '):
+                void = line.startswith('void ')
+            elif line.strip().startswith('return'):
+                assert (line.strip() == 'return;') == void
+
+
+def test_generator_params():
+    def comments(source):
+        tokens = ExtractTokens(source).extract()
+        return sum(token.type == TokenType.COMMENT for token in tokens)
+
+    assert comments(generate_source(0, 5000, comment_ratio=0)) == 0
+    assert comments(generate_source(0, 5000, comment_ratio=0.5)) > 0
+
+
+def test_run_and_compare():
+    results = run(generate_source(0, 2000), ['extract'], repeat=1)
+    assert results['extract']['tokens'] > 0
+    assert results['extract']['tokens_per_sec'] > 0
+    assert results['extract']['peak_alloc_kb'] > 0
+
+    baseline = {'extract': {'tokens_per_sec': results['extract']['tokens_per_sec'] * 2}}
+    assert len(compare(results, baseline, 0.1)) == 1
+    assert compare(results, baseline, 0.6) == []
+    assert compare(results, {}, 0.1) == []
@@ -1,6 +1,7 @@
 import enum
+import hashlib
 import logging
-from typing import Union, Optional
+from typing import Iterator, Union, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -26,15 +27,26 @@ class Token():
         self.src_pos = src_pos
 
     def __eq__(self, other):
-        if type(self) is type(other):
+        if type(self) is not type(other):
             return False
         # may break if new attrs added to other instance
         # should use slots as tokens might be imutable
+        # src_pos is in Token.__slots__ only, so positions are not compared
         for attr in self.__slots__:
             if getattr(self, attr, None) != getattr(other, attr, None):
                 return False
         return True
 
+    def children(self) -> Iterator['Token']:
+        for attr in self.__slots__:
+            value = getattr(self, attr, None)
+            if isinstance(value, Token):
+                yield value
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    if isinstance(item, Token):
+                        yield item
+
     def __str__(self):
         return (
             f"{type(self).__name__}(\n" + 
@@ -120,6 +132,37 @@ class Function(Token):
         self.body = body
 
 
+class FunctionCall(Token):
+    __slots__ = [
+        'name',
+        'args',
+    ]
+
+    def __init__(
+        self,
+        src_pos: tuple[int, int],
+        name: str,
+        args: list[Token],
+    ):
+        super().__init__(src_pos)
+        self.name = name
+        self.args = args
+
+
+class Return(Token):
+    __slots__ = [
+        'value',
+    ]
+
+    def __init__(
+        self,
+        src_pos: tuple[int, int],
+        value: Optional[Token] = None,
+    ):
+        super().__init__(src_pos)
+        self.value = value
+
+
 OpArity = enum.Enum('OpArity', ['Unary', 'Binary'])
 
 OpType = enum.Enum(
@@ -132,7 +175,8 @@ OpType = enum.Enum(
         'UNARY_SUB',
         'REF',
         'DEREF',
-        'ARRAY_ACC'
+        'ARRAY_ACC',
+        'ASSIGN',
     ]
 )
 
@@ -217,3 +261,114 @@ class ForLoop(Token):
         self.condition = condition
         self.increment = increment
         self.body = body
+
+
+# compact form for shipping trees between processes: a flat tuple of nodes
+# made of plain values, children go before parents and are referenced by index
+_token_types: list[type] = [
+    Constant,
+    Variable,
+    Function,
+    FunctionCall,
+    Return,
+    Operator,
+    Condition,
+    WhileLoop,
+    ForLoop,
+]
+_token_type_index = {token_type: index for index, token_type in enumerate(_token_types)}
+_enum_types = [ValType, OpArity, OpType]
+_enum_type_index = {enum_type: index for index, enum_type in enumerate(_enum_types)}
+
+
+def serialize(token: Token) -> tuple:
+    nodes: list[tuple] = []
+    indexes: dict[int, int] = {}
+    # iterative post order, deep expression chains would hit recursion limit
+    stack: list[tuple[Token, bool]] = [(token, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if id(node) in indexes:
+            continue
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children())
+            continue
+        fields = []
+        for attr in node.__slots__:
+            fields.append(_encode_field(getattr(node, attr), indexes))
+        indexes[id(node)] = len(nodes)
+        nodes.append((_token_type_index[type(node)], node.src_pos, *fields))
+    return tuple(nodes)
+
+
+def _encode_field(value, indexes: dict[int, int]):
+    if isinstance(value, Token):
+        return ('@', indexes[id(value)])
+    if isinstance(value, enum.Enum):
+        return ('#', _enum_type_index[type(value)], value.value)
+    if isinstance(value, tuple):
+        return ('(', [indexes[id(item)] for item in value])
+    if isinstance(value, list) and value and isinstance(value[0], Token):
+        return ('[', [indexes[id(item)] for item in value])
+    if isinstance(value, list):
+        # copy, so the serialized form never shares mutable state with the tree
+        return list(value)
+    return value
+
+
+def deserialize(data: tuple) -> Token:
+    nodes: list[Token] = []
+    for type_index, src_pos, *fields in data:
+        token_type = _token_types[type_index]
+        node = token_type.__new__(token_type)
+        node.src_pos = src_pos
+        for attr, value in zip(token_type.__slots__, fields):
+            setattr(node, attr, _decode_field(value, nodes))
+        nodes.append(node)
+    return nodes[-1]
+
+
+def _decode_field(value, nodes: list[Token]):
+    # plain tuples never appear as field values, so a tuple is always a tag
+    if isinstance(value, list):
+        # every tree decoded from the same data gets its own lists
+        return list(value)
+    if not isinstance(value, tuple):
+        return value
+    if value[0] == '@':
+        return nodes[value[1]]
+    if value[0] == '#':
+        return _enum_types[value[1]](value[2])
+    if value[0] == '(':
+        return tuple(nodes[index] for index in value[1])
+    return [nodes[index] for index in value[1]]
+
+
+def structural_hash(token: Token) -> str:
+    # stable between runs and processes (unlike hash()), covers node types,
+    # slot values and children but not src_pos, so moving code doesn't change it
+    digests: dict[int, bytes] = {}
+    stack: list[tuple[Token, bool]] = [(token, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if id(node) in digests:
+            continue
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children())
+            continue
+        digest = hashlib.blake2b(type(node).__name__.encode(), digest_size=16)
+        for attr in node.__slots__:
+            digest.update(b'\0' + attr.encode() + b'=')
+            digest.update(_hash_field(getattr(node, attr), digests))
+        digests[id(node)] = digest.digest()
+    return digests[id(token)].hex()
+
+
+def _hash_field(value, digests: dict[int, bytes]) -> bytes:
+    if isinstance(value, Token):
+        return b'@' + digests[id(value)]
+    if isinstance(value, (list, tuple)) and any(isinstance(item, Token) for item in value):
+        return b'[' + b''.join(_hash_field(item, digests) for item in value) + b']'
+    return repr(value).encode()
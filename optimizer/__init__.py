@@ -0,0 +1,2 @@
+from .cse import CommonSubexpressions, eliminate_common_subexpressions  # noqa
+from .inline import Inliner, InlinedCall  # noqa
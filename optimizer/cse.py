@@ -0,0 +1,247 @@
+import logging
+from typing import NamedTuple, Optional
+
+from c_token import (
+    Condition,
+    Constant,
+    ForLoop,
+    Function,
+    FunctionCall,
+    Operator,
+    OpType,
+    Return,
+    Token,
+    Variable,
+    WhileLoop,
+)
+from semantic import c_types
+from semantic.symbol_table import SymbolTable
+
+
+logger = logging.getLogger(__name__)
+
+
+# variable name with id of its declaration, None for globals
+_Binding = tuple[str, Optional[int]]
+
+
+class _Entry(NamedTuple):
+    node: Token
+    # variables read by the expression and whether it reads memory through
+    # a pointer, used to decide what a write invalidates
+    variables: frozenset[_Binding]
+    memory: bool
+
+
+def _address_taken(function: Function) -> set[str]:
+    result: set[str] = set()
+    stack: list[Token] = list(function.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Operator) and node.type == OpType.REF:
+            if isinstance(node.args, Variable):
+                result.add(node.args.name)
+        stack.extend(node.children())
+    return result
+
+
+class CommonSubexpressions():
+    # Hash-conses side effect free expressions of every basic block, so equal
+    # subexpressions become one shared node. Code generator evaluates a shared
+    # node once and reuses the value, serialize() keeps the sharing.
+    def __init__(self, function: Function):
+        self.function = function
+        # names whose address is taken anywhere in the function, reads of
+        # them may change behind our back through a pointer. By name, not by
+        # declaration: inside a loop &x may come after a write it aliases
+        self._escaped: set[str] = set()
+        # same scopes as in TypeChecker, so every read is resolved to the
+        # declaration it refers to, names declared nowhere are globals
+        self._symbols = SymbolTable()
+        self._table: dict[tuple, _Entry] = {}
+        self._reused = 0
+
+    def eliminate(self) -> int:
+        self._escaped = _address_taken(self.function)
+        self._symbols = SymbolTable()
+        self._reused = 0
+        self._table = {}
+        self._symbols.push()
+        for arg in self.function.args:
+            self._declare(arg)
+        self._block(self.function.body, new_scope=False)
+        self._symbols.pop()
+        logger.info('Reused %d expressions in %s', self._reused, self.function.name)
+        return self._reused
+
+    def _declare(self, variable: Variable):
+        self._symbols.declare(variable.name, c_types.from_names(variable.type), variable)
+        self._kill(frozenset([self._binding(variable.name)]), False)
+
+    def _binding(self, name: str) -> _Binding:
+        symbol = self._symbols.lookup(name)
+        if symbol is None:
+            return name, None
+        return name, id(symbol.declaration)
+
+    def _block(self, body: list[Token], new_scope: bool = True):
+        self._table = {}
+        if new_scope:
+            self._symbols.push()
+        for statement in body:
+            if isinstance(statement, Variable):
+                if statement.value is not None:
+                    statement.value = self._expression(statement.value)
+                self._declare(statement)
+            elif isinstance(statement, Return):
+                if statement.value is not None:
+                    statement.value = self._expression(statement.value)
+            elif isinstance(statement, Condition):
+                statement.condition = self._expression(statement.condition)
+                self._block(statement.body)
+                self._table = {}
+            elif isinstance(statement, WhileLoop):
+                # condition runs again after the body, so it's a block of its own
+                self._table = {}
+                statement.condition = self._expression(statement.condition)
+                self._block(statement.body)
+                self._table = {}
+            elif isinstance(statement, ForLoop):
+                # counter declared in init is visible in the loop only
+                self._symbols.push()
+                if statement.init is not None:
+                    self._block([statement.init], new_scope=False)
+                for attr in ('condition', 'increment'):
+                    self._table = {}
+                    if getattr(statement, attr) is not None:
+                        setattr(statement, attr, self._expression(getattr(statement, attr)))
+                self._block(statement.body)
+                self._symbols.pop()
+                self._table = {}
+            else:
+                self._expression(statement)
+        if new_scope:
+            self._symbols.pop()
+
+    def _expression(self, node: Token) -> Token:
+        # returns canonical node to be used instead of node. Iterative post
+        # order, deep expression chains would hit recursion limit; operands
+        # are done left to right before their operator, as a recursion would
+        work: list[tuple[Token, Optional[int]]] = [(node, None)]
+        results: list[Token] = []
+        while work:
+            current, count = work.pop()
+            if count is None:
+                operands = self._operands(current)
+                work.append((current, len(operands)))
+                work.extend((operand, None) for operand in reversed(operands))
+                continue
+            operands = results[len(results) - count:]
+            del results[len(results) - count:]
+            results.append(self._canonical(current, operands))
+        return results[0]
+
+    @staticmethod
+    def _operands(node: Token) -> list[Token]:
+        # subexpressions in evaluation order
+        if isinstance(node, FunctionCall):
+            return list(node.args)
+        if not isinstance(node, Operator):
+            return []
+        if node.type == OpType.ASSIGN:
+            target, value = node.args
+            if not isinstance(target, Operator):
+                return [value]
+            # address part of the target is an ordinary read
+            address = target.args if isinstance(target.args, tuple) else (target.args,)
+            return [value, *address]
+        return list(node.args) if isinstance(node.args, tuple) else [node.args]
+
+    def _canonical(self, node: Token, operands: list[Token]) -> Token:
+        # operands are canonical forms of _operands(node)
+        if isinstance(node, Constant):
+            return self._intern(node, frozenset(), False)
+        if isinstance(node, Variable) and node.value is None:
+            return self._intern(node, frozenset([self._binding(node.name)]), False)
+        if isinstance(node, FunctionCall):
+            node.args = operands
+            self._kill_aliased()
+            return node
+        if not isinstance(node, Operator):
+            return node
+
+        if node.type == OpType.ASSIGN:
+            target = node.args[0]
+            value, *address = operands
+            if isinstance(target, Operator):
+                target.args = tuple(address) if isinstance(target.args, tuple) else address[0]
+            node.args = (target, value)
+            if isinstance(target, Variable):
+                # pointers from arguments may point to any global
+                binding = self._binding(target.name)
+                self._kill(
+                    frozenset([binding]), binding[1] is None or target.name in self._escaped
+                )
+            else:
+                self._kill_aliased()
+            return node
+
+        node.args = tuple(operands) if isinstance(node.args, tuple) else operands[0]
+        if node.type == OpType.REF:
+            # address of a variable never changes, but don't merge with reads
+            return node
+        variables: frozenset[_Binding] = frozenset()
+        memory = node.type in (OpType.DEREF, OpType.ARRAY_ACC)
+        for arg in operands:
+            entry = self._table.get(self._key_of(arg)) if isinstance(
+                arg, (Constant, Variable, Operator)
+            ) else None
+            if entry is None or entry.node is not arg:
+                # operand isn't pure, so neither is the operator
+                return node
+            variables |= entry.variables
+            memory = memory or entry.memory
+        return self._intern(node, variables, memory)
+
+    def _key_of(self, node: Token) -> tuple:
+        if isinstance(node, Constant):
+            return ('Constant', node.type, type(node.value).__name__, node.value)
+        if isinstance(node, Variable):
+            # a local shadowing a global is another variable with the same name
+            return ('Variable', self._binding(node.name), tuple(node.type))
+        # operands are canonical already, so their identity stands for their value
+        args = node.args if isinstance(node.args, tuple) else (node.args,)
+        return ('Operator', node.arity, node.type, tuple(id(arg) for arg in args))
+
+    def _intern(self, node: Token, variables: frozenset[_Binding], memory: bool) -> Token:
+        key = self._key_of(node)
+        entry = self._table.get(key)
+        if entry is not None:
+            if not isinstance(node, (Constant, Variable)):
+                self._reused += 1
+            return entry.node
+        self._table[key] = _Entry(node, variables, memory)
+        return node
+
+    def _kill(self, variables: frozenset[_Binding], memory: bool):
+        self._table = {
+            key: entry for key, entry in self._table.items()
+            if not (entry.variables & variables or memory and entry.memory)
+        }
+
+    def _kill_aliased(self):
+        # unknown code or write through a pointer: any memory, any variable
+        # whose address was taken and any global may have changed
+        self._table = {
+            key: entry for key, entry in self._table.items()
+            if not entry.memory and all(
+                declaration is not None and name not in self._escaped
+                for name, declaration in entry.variables
+            )
+        }
+
+
+def eliminate_common_subexpressions(function: Function) -> Function:
+    # pass for backend.compile_functions
+    CommonSubexpressions(function).eliminate()
+    return function
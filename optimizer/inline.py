@@ -0,0 +1,293 @@
+import copy
+import logging
+from typing import NamedTuple, Optional
+
+from c_token import (
+    Condition,
+    ForLoop,
+    Function,
+    FunctionCall,
+    Operator,
+    OpType,
+    Return,
+    Token,
+    Variable,
+    WhileLoop,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class InlinedCall(NamedTuple):
+    caller: str
+    callee: str
+    src_pos: tuple
+    cost: int
+
+
+def node_count(token: Token) -> int:
+    count = 1
+    stack = list(token.children())
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children())
+    return count
+
+
+def function_cost(function: Function) -> int:
+    return sum(node_count(arg) for arg in function.args) + sum(
+        node_count(statement) for statement in function.body
+    )
+
+
+def _collect_calls(token: Token, result: set[str]):
+    stack = [token]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, FunctionCall):
+            result.add(node.name)
+        stack.extend(node.children())
+
+
+def _declared_names(body: list[Token]) -> list[str]:
+    # variables standing as statements are declarations, anything deeper is a use
+    result: list[str] = []
+    stack = list(body)
+    while stack:
+        statement = stack.pop()
+        if isinstance(statement, Variable):
+            result.append(statement.name)
+        if isinstance(statement, ForLoop) and isinstance(statement.init, Variable):
+            result.append(statement.init.name)
+        if isinstance(statement, (Condition, WhileLoop, ForLoop)):
+            stack.extend(statement.body)
+    return result
+
+
+def _free_names(function: Function) -> set[str]:
+    # names the function reads without declaring them, i.e. globals
+    used: set[str] = set()
+    stack: list[Token] = list(function.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Variable):
+            used.add(node.name)
+        stack.extend(node.children())
+    return used - {arg.name for arg in function.args} - set(_declared_names(function.body))
+
+
+def _has_side_effects(token: Token) -> bool:
+    stack = [token]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, FunctionCall) or (
+            isinstance(node, Operator) and node.type == OpType.ASSIGN
+        ):
+            return True
+        stack.extend(node.children())
+    return False
+
+
+class Inliner():
+    def __init__(
+        self,
+        functions: list[Function],
+        max_callee_size: int = 40,
+        caller_budget: int = 200,
+    ):
+        self.functions = {function.name: function for function in functions}
+        self.max_callee_size = max_callee_size
+        self.caller_budget = caller_budget
+        self._counter = 0
+        self._caller = ''
+        self._caller_names: set[str] = set()
+        self._budget = caller_budget
+        self._recursive: set[str] = set()
+        self._report: list[InlinedCall] = []
+
+    def inline(self) -> list[InlinedCall]:
+        self._report = []
+        call_graph = self._call_graph()
+        order: list[str] = []
+        for component in self._strongly_connected(call_graph):
+            if len(component) > 1 or component[0] in call_graph[component[0]]:
+                self._recursive.update(component)
+            order.extend(component)
+
+        # components come out callees first, so every callee is already
+        # in its final shape by the time it gets copied into its callers
+        for name in order:
+            function = self.functions[name]
+            self._budget = self.caller_budget
+            self._caller = name
+            self._caller_names = {arg.name for arg in function.args} | set(
+                _declared_names(function.body)
+            )
+            function.body = self._inline_body(function.body)
+        return self._report
+
+    def _call_graph(self) -> dict[str, set[str]]:
+        graph: dict[str, set[str]] = {}
+        for name, function in self.functions.items():
+            calls: set[str] = set()
+            for statement in function.body:
+                _collect_calls(statement, calls)
+            graph[name] = {callee for callee in calls if callee in self.functions}
+        return graph
+
+    @staticmethod
+    def _strongly_connected(graph: dict[str, set[str]]) -> list[list[str]]:
+        # iterative tarjan, recursion would blow up on long call chains
+        index: dict[str, int] = {}
+        low: dict[str, int] = {}
+        on_stack: set[str] = set()
+        stack: list[str] = []
+        result: list[list[str]] = []
+        for root in graph:
+            if root in index:
+                continue
+            work = [(root, iter(sorted(graph[root])))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = low[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(sorted(graph[successor]))))
+                        break
+                    if successor in on_stack:
+                        low[node] = min(low[node], index[successor])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        result.append(component)
+        return result
+
+    def _inline_body(self, body: list[Token]) -> list[Token]:
+        result: list[Token] = []
+        for statement in body:
+            if isinstance(statement, (Condition, WhileLoop, ForLoop)):
+                statement.body = self._inline_body(statement.body)
+
+            call = self._site(statement)
+            callee = self._candidate(call)
+            if callee is None:
+                result.append(statement)
+                continue
+
+            expanded, value = self._expand(call, callee)
+            result.extend(expanded)
+            if isinstance(statement, FunctionCall):
+                # value of a bare call is dropped unless computing it does
+                # something, a Variable standing as a statement is a declaration
+                if value is not None and _has_side_effects(value):
+                    result.append(value)
+            else:
+                statement.value = value
+                result.append(statement)
+        return result
+
+    @staticmethod
+    def _site(statement: Token) -> Optional[FunctionCall]:
+        # only statement level calls are inlined: the call itself, the
+        # initialiser of a declaration or the value of a return
+        if isinstance(statement, FunctionCall):
+            return statement
+        if isinstance(statement, (Variable, Return)) and isinstance(statement.value, FunctionCall):
+            return statement.value
+        return None
+
+    def _candidate(self, call: Optional[FunctionCall]) -> Optional[Function]:
+        if call is None:
+            return None
+        callee = self.functions.get(call.name)
+        if callee is None or callee.name in self._recursive:
+            return None
+        if len(callee.args) != len(call.args) or not self._single_exit(callee):
+            return None
+        shadowed = _free_names(callee) & self._caller_names
+        if shadowed:
+            # a local of the caller would capture the global the callee reads
+            logger.debug(
+                '%s reads %s shadowed in %s', callee.name, ', '.join(sorted(shadowed)), self._caller
+            )
+            return None
+        cost = function_cost(callee)
+        if cost > self.max_callee_size:
+            logger.debug('%s is too big to be inlined (%d)', callee.name, cost)
+            return None
+        if cost > self._budget:
+            logger.debug('%s is out of inline budget at %s', self._caller, call.src_pos)
+            return None
+        return callee
+
+    @staticmethod
+    def _single_exit(function: Function) -> bool:
+        # the only return allowed is the last statement of the body,
+        # otherwise the body can't be spliced without jumps
+        last = function.body[-1] if function.body else None
+        stack = list(function.body)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Return) and node is not last:
+                return False
+            stack.extend(node.children())
+        return True
+
+    def _expand(
+        self,
+        call: FunctionCall,
+        callee: Function,
+    ) -> tuple[list[Token], Optional[Token]]:
+        self._counter += 1
+        cost = function_cost(callee)
+        self._budget -= cost
+        self._report.append(InlinedCall(self._caller, callee.name, call.src_pos, cost))
+        logger.info('Inlined %s into %s at %s', callee.name, self._caller, call.src_pos)
+
+        body = copy.deepcopy(callee.body)
+        renames = {
+            name: self._rename(callee.name, name)
+            for name in [arg.name for arg in callee.args] + _declared_names(body)
+        }
+
+        expanded: list[Token] = [
+            Variable(arg.src_pos, renames[arg.name], list(arg.type), actual)
+            for arg, actual in zip(callee.args, call.args)
+        ]
+        for statement in body:
+            self._apply_renames(statement, renames)
+
+        value = None
+        if body and isinstance(body[-1], Return):
+            value = body.pop().value
+        expanded.extend(body)
+        return expanded, value
+
+    def _rename(self, function_name: str, name: str) -> str:
+        # dots can't appear in identifiers so there's nothing to collide with
+        return f'{function_name}.{self._counter}.{name}'
+
+    @staticmethod
+    def _apply_renames(token: Token, renames: dict[str, str]):
+        stack = [token]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Variable) and node.name in renames:
+                node.name = renames[node.name]
+            stack.extend(node.children())
@@ -0,0 +1,170 @@
+from c_token import (
+    Condition,
+    Constant,
+    Function,
+    FunctionCall,
+    OpArity,
+    Operator,
+    OpType,
+    ValType,
+    Variable,
+    WhileLoop,
+    serialize,
+)
+
+from ..cse import CommonSubexpressions
+
+
+def _var(name, var_type=('int',)):
+    return Variable((0, 0), name, list(var_type))
+
+
+def _const(value):
+    return Constant((0, 0), ValType.INT, value)
+
+
+def _op(op_type, *args):
+    if len(args) == 1:
+        return Operator((0, 0), OpArity.Unary, op_type, args[0])
+    return Operator((0, 0), OpArity.Binary, op_type, args)
+
+
+def _product():
+    # a[i] * b
+    return _op(OpType.MUL, _op(OpType.ARRAY_ACC, _var('a', ('int', '*')), _var('i')), _var('b'))
+
+
+def _double():
+    # b * 2
+    return _op(OpType.MUL, _var('b'), _const(2))
+
+
+def _function(body):
+    return Function(
+        (0, 0), ['int'], 'f',
+        [_var('a', ('int', '*')), _var('p', ('int', '*')), _var('i'), _var('b')],
+        body,
+    )
+
+
+def _declare(name, value):
+    return Variable((0, 0), name, ['int'], value)
+
+
+def test_shared_subexpression():
+    first, second = _declare('x', _product()), _declare('y', _product())
+    function = _function([first, second])
+    assert CommonSubexpressions(function).eliminate() == 2
+    assert second.value is first.value
+    # shared node is stored once
+    assert len(serialize(function)) < len(serialize(_function([
+        _declare('x', _product()), _declare('y', _product())
+    ])))
+
+
+def test_assignment_invalidates():
+    first, second = _declare('x', _product()), _declare('y', _product())
+    function = _function([
+        first,
+        _op(OpType.ASSIGN, _var('b'), _const(2)),
+        second,
+    ])
+    CommonSubexpressions(function).eliminate()
+    assert second.value is not first.value
+    # a[i] doesn't depend on b, so it's still shared
+    assert second.value.args[0] is first.value.args[0]
+
+
+def test_pointer_write_invalidates_memory_reads():
+    first, second = _declare('x', _product()), _declare('y', _product())
+    first_double, second_double = _declare('u', _double()), _declare('v', _double())
+    function = _function([
+        first, first_double,
+        _op(OpType.ASSIGN, _op(OpType.DEREF, _var('p', ('int', '*'))), _const(1)),
+        second, second_double,
+    ])
+    CommonSubexpressions(function).eliminate()
+    assert second.value is not first.value
+    assert second.value.args[0] is not first.value.args[0]
+    assert second_double.value is first_double.value
+
+    # once address of b escapes, writes through pointers may change it
+    first_double, second_double = _declare('u', _double()), _declare('v', _double())
+    function = _function([
+        _declare('q', _op(OpType.REF, _var('b'))),
+        first_double,
+        _op(OpType.ASSIGN, _op(OpType.DEREF, _var('p', ('int', '*'))), _const(1)),
+        second_double,
+    ])
+    CommonSubexpressions(function).eliminate()
+    assert second_double.value is not first_double.value
+
+
+def test_calls_and_blocks():
+    first = _declare('x', _op(OpType.MUL, _var('g'), _var('b')))
+    second = _declare('y', _op(OpType.MUL, _var('g'), _var('b')))
+    local_first = _declare('u', _op(OpType.MUL, _var('b'), _var('b')))
+    local_second = _declare('v', _op(OpType.MUL, _var('b'), _var('b')))
+    in_loop = _declare('w', _op(OpType.MUL, _var('b'), _var('b')))
+    function = _function([
+        first, local_first,
+        FunctionCall((0, 0), 'update', []),
+        second, local_second,
+        WhileLoop((0, 0), _var('b'), [in_loop]),
+    ])
+    CommonSubexpressions(function).eliminate()
+    # g is global, the call may have changed it
+    assert second.value is not first.value
+    assert local_second.value is local_first.value
+    assert in_loop.value is not local_first.value
+
+
+def test_globals_are_resolved_by_scope():
+    # int x = g + 1; set_g(); int y = g + 1; if (b) { int g = 0; }
+    first = _declare('x', _op(OpType.ADD, _var('g'), _const(1)))
+    second = _declare('y', _op(OpType.ADD, _var('g'), _const(1)))
+    function = _function([
+        first,
+        FunctionCall((0, 0), 'set_g', []),
+        second,
+        Condition((0, 0), _var('b'), [_declare('g', _const(0))]),
+    ])
+    CommonSubexpressions(function).eliminate()
+    assert second.value is not first.value
+
+    # a local shadowing the global is a different variable
+    global_read = _declare('x', _op(OpType.ADD, _var('g'), _const(1)))
+    local_read = _declare('y', _op(OpType.ADD, _var('g'), _const(1)))
+    function = _function([global_read, _declare('g', _const(0)), local_read])
+    CommonSubexpressions(function).eliminate()
+    assert local_read.value is not global_read.value
+
+
+def test_global_write_invalidates_memory_reads():
+    # int y = *p; g = 5; int z = *p;
+    first = _declare('y', _op(OpType.DEREF, _var('p', ('int', '*'))))
+    second = _declare('z', _op(OpType.DEREF, _var('p', ('int', '*'))))
+    function = _function([first, _op(OpType.ASSIGN, _var('g'), _const(5)), second])
+    CommonSubexpressions(function).eliminate()
+    assert second.value is not first.value
+
+    # writes to locals whose address is never taken don't touch memory
+    first = _declare('y', _op(OpType.DEREF, _var('p', ('int', '*'))))
+    second = _declare('z', _op(OpType.DEREF, _var('p', ('int', '*'))))
+    function = _function([first, _op(OpType.ASSIGN, _var('b'), _const(5)), second])
+    CommonSubexpressions(function).eliminate()
+    assert second.value is first.value
+
+
+def test_deep_expression():
+    # b + b + ... + b twice, left nested deeper than the recursion limit
+    def chain():
+        result = _var('b')
+        for _ in range(5000):
+            result = _op(OpType.ADD, result, _var('b'))
+        return result
+
+    first, second = _declare('x', chain()), _declare('y', chain())
+    function = _function([first, second])
+    assert CommonSubexpressions(function).eliminate() == 5000
+    assert second.value is first.value
@@ -0,0 +1,140 @@
+from c_token import (
+    Constant,
+    Function,
+    FunctionCall,
+    OpArity,
+    Operator,
+    OpType,
+    Return,
+    ValType,
+    Variable,
+    WhileLoop,
+)
+from semantic import TypeChecker
+
+from ..inline import Inliner, InlinedCall, node_count
+
+
+def _square():
+    return Function(
+        (1, 1), ['int'], 'square',
+        [Variable((1, 2), 'a', ['int'])],
+        [
+            Return((1, 3), Operator(
+                (1, 4), OpArity.Binary, OpType.MUL,
+                (Variable((1, 5), 'a', ['int']), Variable((1, 6), 'a', ['int']))
+            )),
+        ]
+    )
+
+
+def test_node_count():
+    assert node_count(Constant((1, 1), ValType.INT, 1)) == 1
+    assert node_count(_square().body[0]) == 4
+
+
+def test_inline_declaration():
+    main = Function(
+        (2, 1), ['int'], 'main', [],
+        [
+            Variable((2, 2), 'a', ['int'], Constant((2, 3), ValType.INT, 3)),
+            Variable((2, 4), 'b', ['int'], FunctionCall((2, 5), 'square', [
+                Variable((2, 6), 'a', ['int'])
+            ])),
+            Return((2, 7), Variable((2, 8), 'b', ['int'])),
+        ]
+    )
+    report = Inliner([_square(), main]).inline()
+    assert report == [InlinedCall('main', 'square', (2, 5), 5)]
+    assert [type(statement).__name__ for statement in main.body] == [
+        'Variable', 'Variable', 'Variable', 'Return'
+    ]
+    param = main.body[1]
+    assert param.name == 'square.1.a'
+    assert param.value.name == 'a'
+    result = main.body[2]
+    assert result.name == 'b'
+    assert result.value.type == OpType.MUL
+    assert [arg.name for arg in result.value.args] == ['square.1.a', 'square.1.a']
+
+
+def test_inline_renames_each_site():
+    main = Function(
+        (2, 1), ['int'], 'main', [],
+        [
+            WhileLoop((2, 2), Constant((2, 3), ValType.INT, 1), [
+                FunctionCall((2, 4), 'square', [Constant((2, 5), ValType.INT, 1)]),
+                FunctionCall((2, 6), 'square', [Constant((2, 7), ValType.INT, 2)]),
+            ]),
+        ]
+    )
+    report = Inliner([_square(), main]).inline()
+    assert len(report) == 2
+    names = [statement.name for statement in main.body[0].body if isinstance(statement, Variable)]
+    assert names == ['square.1.a', 'square.2.a']
+
+
+def test_inline_skips_recursion():
+    recursive = Function(
+        (1, 1), ['int'], 'rec', [],
+        [Return((1, 2), FunctionCall((1, 3), 'rec', []))]
+    )
+    ping = Function((2, 1), ['void'], 'ping', [], [FunctionCall((2, 2), 'pong', [])])
+    pong = Function((3, 1), ['void'], 'pong', [], [FunctionCall((3, 2), 'ping', [])])
+    main = Function(
+        (4, 1), ['int'], 'main', [],
+        [FunctionCall((4, 2), 'ping', []), Return((4, 3), FunctionCall((4, 4), 'rec', []))]
+    )
+    assert Inliner([recursive, ping, pong, main]).inline() == []
+
+
+def test_inline_budget():
+    main = Function(
+        (2, 1), ['int'], 'main', [],
+        [
+            FunctionCall((2, 2), 'square', [Constant((2, 3), ValType.INT, 1)]),
+            FunctionCall((2, 4), 'square', [Constant((2, 5), ValType.INT, 2)]),
+        ]
+    )
+    report = Inliner([_square(), main], caller_budget=6).inline()
+    assert [call.src_pos for call in report] == [(2, 2)]
+    assert isinstance(main.body[-1], FunctionCall)
+
+    main.body = [FunctionCall((2, 2), 'square', [Constant((2, 3), ValType.INT, 1)])]
+    assert Inliner([_square(), main], max_callee_size=4).inline() == []
+
+
+def test_inline_skips_shadowed_globals():
+    # int f() { return g; } can't go to a caller with its own g
+    getter = Function((1, 1), ['int'], 'f', [], [Return((1, 2), Variable((1, 3), 'g', ['int']))])
+    main = Function(
+        (2, 1), ['int'], 'main', [],
+        [
+            Variable((2, 2), 'g', ['int'], Constant((2, 3), ValType.INT, 5)),
+            Return((2, 4), FunctionCall((2, 5), 'f', [])),
+        ]
+    )
+    assert Inliner([getter, main]).inline() == []
+    assert isinstance(main.body[-1].value, FunctionCall)
+
+    main.body[0].name = 'h'
+    assert len(Inliner([getter, main]).inline()) == 1
+    assert main.body[-1].value.name == 'g'
+
+
+def test_inline_drops_unused_value():
+    identity = Function(
+        (1, 1), ['int'], 'id', [Variable((1, 2), 'a', ['int'])],
+        [Return((1, 3), Variable((1, 4), 'a', ['int']))]
+    )
+    main = Function(
+        (2, 1), ['int'], 'main', [],
+        [
+            FunctionCall((2, 2), 'id', [Constant((2, 3), ValType.INT, 5)]),
+            Return((2, 4), Constant((2, 5), ValType.INT, 0)),
+        ]
+    )
+    assert len(Inliner([identity, main]).inline()) == 1
+    assert [type(statement).__name__ for statement in main.body] == ['Variable', 'Return']
+    # output is still a valid program
+    TypeChecker([identity, main]).check()
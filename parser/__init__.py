@@ -1 +1,2 @@
-from .extract_tokens import ExtractTokens  # noqa
\ No newline at end of file
+from .extract_tokens import ExtractTokens  # noqa
+from .preprocessor import Preprocessor  # noqa
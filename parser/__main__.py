@@ -1,13 +1,18 @@
 import click
+import json
 import logging
+import os
+import sys
 
-from . import ExtractTokens
+from . import Preprocessor
+from .instrumentation import stats
 
 
 logger = logging.getLogger(__name__)
 
 
 @click.command()
+@click.pass_context
 @click.argument('input_files', type=click.Path(), nargs=-1)
 @click.option(
     '-v',
@@ -15,7 +20,27 @@ logger = logging.getLogger(__name__)
     count=True,
     help='Verbosity level -vv: debug, -v: info, default: error',
 )
-def main(input_files, verbose):
+@click.option(
+    '-I',
+    '--include-dir',
+    'include_dirs',
+    type=click.Path(file_okay=False),
+    multiple=True,
+    help='Additional directory to search for #include "..." files',
+)
+@click.option(
+    '--stats',
+    '--profile',
+    'print_stats',
+    is_flag=True,
+    help='Print per stage and per extractor counters to stderr',
+)
+@click.option(
+    '--stats-json',
+    type=click.File('w'),
+    help='Dump per stage and per extractor counters as JSON to file, - for stdout',
+)
+def main(ctx, input_files, verbose, include_dirs, print_stats, stats_json):
     if verbose <= 0:
         logging.basicConfig(
             level=logging.WARNING,
@@ -32,10 +57,23 @@ def main(input_files, verbose):
             format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)d - %(message)s',
         )
 
+    stats.enabled = print_stats or stats_json is not None
+    stats.reset()
+
+    # headers are shared between all files of one run, compile server
+    # passes its own cache to keep headers between runs
+    header_cache = {} if ctx.obj is None else ctx.obj
     for file in input_files:
-        with open(file) as f:
-            raw_tokens = ExtractTokens(f.read()).extract()
-            print(*raw_tokens, sep='\n')
+        # size of the file itself, included headers are not counted
+        size = os.path.getsize(file) if stats.enabled and os.path.isfile(file) else 0
+        with stats.stage('preprocess', size):
+            raw_tokens = Preprocessor(file, include_dirs, header_cache).process()
+        print(*raw_tokens, sep='\n')
+
+    if print_stats:
+        print(stats.report(), file=sys.stderr)
+    if stats_json is not None:
+        json.dump(stats.as_dict(), stats_json, indent=4)
 
 
 if __name__ == '__main__':
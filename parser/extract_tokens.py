@@ -1,6 +1,7 @@
 import enum
 from typing import Callable, Optional
 
+from .instrumentation import stats
 from .position_handler import FileAwarePosition
 
 
@@ -53,8 +54,6 @@ class ExtractTokens():
         self.position: int = 0
 
     def extract(self) -> list[RawToken]:
-        result: list[RawToken] = []
-
         extractors: list[Callable[[], tuple[Optional[RawToken], int]]] = [
             self._extract_comment,
             self._extract_number,
@@ -63,6 +62,25 @@ class ExtractTokens():
             self._extract_identifier,
             self._extract_op,
         ]
+        if not stats.enabled:
+            return self._extract(extractors)
+
+        # time spent in convert is also included in time of extractor calling it
+        self.position_handler.convert = stats.timed(
+            'position.convert', self.position_handler.convert
+        )
+        with stats.stage('extract', len(self.content.encode())) as counter:
+            result = self._extract([
+                stats.extractor(f'extractor.{func.__name__}', func) for func in extractors
+            ])
+            counter.hits += len(result)
+        return result
+
+    def _extract(
+        self,
+        extractors: list[Callable[[], tuple[Optional[RawToken], int]]],
+    ) -> list[RawToken]:
+        result: list[RawToken] = []
         while self.position < len(self.content):
             for extract_func in extractors:
                 flag = False
@@ -0,0 +1,96 @@
+import contextlib
+import time
+from typing import Callable, Iterator, Optional
+
+
+class Counter():
+    __slots__ = [
+        'calls',
+        'hits',
+        'bytes',
+        'seconds',
+    ]
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+class Stats():
+    # nothing is wrapped while disabled, so the only cost is one flag
+    # check per extract() call
+    def __init__(self):
+        self.enabled = False
+        self.counters: dict[str, Counter] = {}
+
+    def reset(self):
+        self.counters = {}
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = Counter()
+        return counter
+
+    def extractor(self, name: str, func: Callable) -> Callable:
+        # func returns (token or None, position) like ExtractTokens._extract_*
+        counter = self.counter(name)
+        perf_counter = time.perf_counter
+
+        def wrapper():
+            start = perf_counter()
+            token, position = func()
+            counter.seconds += perf_counter() - start
+            counter.calls += 1
+            if token:
+                counter.hits += 1
+                counter.bytes += len(token.data.encode())
+            return token, position
+        return wrapper
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        counter = self.counter(name)
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            counter.seconds += perf_counter() - start
+            counter.calls += 1
+            counter.hits += 1
+            return result
+        return wrapper
+
+    @contextlib.contextmanager
+    def stage(self, name: str, size: int = 0) -> Iterator[Optional[Counter]]:
+        if not self.enabled:
+            yield None
+            return
+        counter = self.counter(f'stage.{name}')
+        start = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            counter.seconds += time.perf_counter() - start
+            counter.calls += 1
+            counter.bytes += size
+
+    def as_dict(self) -> dict[str, dict]:
+        return {name: counter.as_dict() for name, counter in sorted(self.counters.items())}
+
+    def report(self) -> str:
+        lines = [f'{"name":<32}{"calls":>10}{"hits":>10}{"bytes":>12}{"seconds":>12}']
+        for name, counter in sorted(self.counters.items()):
+            lines.append(
+                f'{name:<32}{counter.calls:>10}{counter.hits:>10}'
+                f'{counter.bytes:>12}{counter.seconds:>12.6f}'
+            )
+        return '\n'.join(lines)
+
+
+stats = Stats()
@@ -0,0 +1,402 @@
+import asyncio
+import click
+import concurrent.futures
+import json
+import logging
+import sys
+from typing import Callable, Optional
+
+from const import type_names
+
+from .extract_tokens import ExtractTokens, RawToken, TokenType
+
+
+logger = logging.getLogger(__name__)
+
+
+semantic_token_types = [
+    'keyword',
+    'variable',
+    'operator',
+    'comment',
+    'number',
+    'string',
+]
+
+_keywords = set(type_names) | {
+    'long', 'float', 'double', 'if', 'else', 'for', 'while', 'return',
+}
+
+_token_type_index = {
+    TokenType.IDENTIFIER: semantic_token_types.index('variable'),
+    TokenType.OP: semantic_token_types.index('operator'),
+    TokenType.COMMENT: semantic_token_types.index('comment'),
+    TokenType.FLOAT_CONST: semantic_token_types.index('number'),
+    TokenType.DEC_INT_CONST: semantic_token_types.index('number'),
+    TokenType.HEX_INT_CONST: semantic_token_types.index('number'),
+    TokenType.OCT_INT_CONST: semantic_token_types.index('number'),
+    TokenType.BIN_INT_CONST: semantic_token_types.index('number'),
+    TokenType.STRING_CONST: semantic_token_types.index('string'),
+    TokenType.CHAR_CONST: semantic_token_types.index('string'),
+}
+
+# json-rpc error codes
+_parse_error = -32700
+_invalid_request = -32600
+_method_not_found = -32601
+_invalid_params = -32602
+_internal_error = -32603
+_request_cancelled = -32800
+
+
+def encode_tokens(tokens: list[RawToken]) -> list[int]:
+    # LSP relative encoding: delta line, delta start, length, type, modifiers,
+    # tokens spanning several lines are split as clients don't expect multiline ones
+    result: list[int] = []
+    previous_line = previous_column = 0
+    for token in tokens:
+        line, column = (int(part) - 1 for part in token.src_pos[0].split(':'))
+        if token.type == TokenType.IDENTIFIER and token.data in _keywords:
+            token_type = semantic_token_types.index('keyword')
+        else:
+            token_type = _token_type_index[token.type]
+        for index, part in enumerate(token.data.split('\n')):
+            if index:
+                line += 1
+                column = 0
+            if not part:
+                continue
+            delta_line = line - previous_line
+            delta_column = column - previous_column if delta_line == 0 else column
+            result.extend((delta_line, delta_column, len(part), token_type, 0))
+            previous_line, previous_column = line, column
+    return result
+
+
+def token_edits(previous: list[int], current: list[int]) -> list[dict]:
+    start = 0
+    limit = min(len(previous), len(current))
+    while start < limit and previous[start] == current[start]:
+        start += 1
+    end = 0
+    while (
+        end < limit - start
+        and previous[len(previous) - end - 1] == current[len(current) - end - 1]
+    ):
+        end += 1
+    if start == len(previous) == len(current):
+        return []
+    return [{
+        'start': start,
+        'deleteCount': len(previous) - start - end,
+        'data': current[start:len(current) - end],
+    }]
+
+
+def analyze(text: str) -> tuple[Optional[list[int]], list[dict]]:
+    # runs in executor, so it takes and returns only plain data
+    try:
+        tokens = ExtractTokens(text).extract()
+    except SyntaxError as error:
+        line = (error.lineno or 1) - 1
+        column = (error.offset or 1) - 1
+        return None, [{
+            'range': {
+                'start': {'line': line, 'character': column},
+                'end': {'line': line, 'character': column + 1},
+            },
+            'severity': 1,
+            'source': 'c_compiler',
+            'message': error.msg,
+        }]
+    return encode_tokens(tokens), []
+
+
+class Document():
+    __slots__ = [
+        'uri',
+        'version',
+        'text',
+        'tokens',
+        'diagnostics',
+        'result_id',
+        'sent_tokens',
+        'task',
+    ]
+
+    def __init__(self, uri: str, version: int, text: str):
+        self.uri = uri
+        self.version = version
+        self.text = text
+        self.tokens: list[int] = []
+        self.diagnostics: list[dict] = []
+        self.result_id = 0
+        # last token data returned to client, base for the next delta
+        self.sent_tokens: Optional[list[int]] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class LanguageServer():
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        write: Callable[[bytes], None],
+        debounce: float = 0.2,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        self.reader = reader
+        self.write = write
+        self.debounce = debounce
+        self.executor = executor
+        self.documents: dict[str, Document] = {}
+        self._requests: dict = {}
+        self._shutdown = False
+        self._notifications = {
+            'initialized': lambda params: None,
+            'textDocument/didOpen': self._did_open,
+            'textDocument/didChange': self._did_change,
+            'textDocument/didClose': self._did_close,
+            '$/cancelRequest': self._cancel_request,
+        }
+        self._methods = {
+            'initialize': self._initialize,
+            'shutdown': self._shutdown_request,
+            'textDocument/semanticTokens/full': self._semantic_tokens,
+            'textDocument/semanticTokens/full/delta': self._semantic_tokens_delta,
+        }
+
+    async def serve(self) -> int:
+        while True:
+            try:
+                message = await self._read_message()
+            except ValueError as error:
+                # framing or json is broken, there's no id to answer to
+                logger.warning('Invalid message: %s', error)
+                self._send({'id': None, 'error': {'code': _parse_error, 'message': str(error)}})
+                continue
+            if message is None:
+                break
+            if not isinstance(message, dict) or not isinstance(message.get('method', ''), str):
+                logger.warning('Invalid message: %r', message)
+                self._send({
+                    'id': message.get('id') if isinstance(message, dict) else None,
+                    'error': {'code': _invalid_request, 'message': 'Invalid request'},
+                })
+                continue
+            if message.get('method') == 'exit':
+                break
+            if 'id' in message and 'method' in message:
+                # requests may wait for analysis, so each gets its own task;
+                # notifications are applied in order right away
+                task = asyncio.create_task(self._handle_request(message))
+                self._requests[message['id']] = task
+                task.add_done_callback(lambda _, id=message['id']: self._requests.pop(id, None))
+            elif 'method' in message:
+                handler = self._notifications.get(message['method'])
+                if handler is None:
+                    continue
+                # nothing can be answered to a notification, a bad one
+                # (e.g. change of a document that was never opened) is dropped
+                try:
+                    handler(message.get('params', {}))
+                except Exception:
+                    logger.exception('Ignoring invalid %s notification', message['method'])
+        # answer everything that was asked before exit, shutdown included
+        await asyncio.gather(*self._requests.values(), return_exceptions=True)
+        for document in self.documents.values():
+            if document.task is not None:
+                document.task.cancel()
+        return 0 if self._shutdown else 1
+
+    async def _read_message(self) -> Optional[dict]:
+        length = None
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.decode('ascii').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        if length is None:
+            raise ValueError('Message without Content-Length')
+        try:
+            body = await self.reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
+        # JSONDecodeError and UnicodeDecodeError are ValueErrors too
+        return json.loads(body)
+
+    def _send(self, message: dict):
+        message['jsonrpc'] = '2.0'
+        body = json.dumps(message).encode()
+        self.write(f'Content-Length: {len(body)}\r\n\r\n'.encode('ascii') + body)
+
+    async def _handle_request(self, message: dict):
+        method = self._methods.get(message['method'])
+        if method is None:
+            self._send({
+                'id': message['id'],
+                'error': {
+                    'code': _method_not_found,
+                    'message': f'Unknown method {message["method"]}',
+                },
+            })
+            return
+        try:
+            result = await method(message.get('params', {}))
+        except asyncio.CancelledError:
+            self._send({
+                'id': message['id'],
+                'error': {'code': _request_cancelled, 'message': 'Request cancelled'},
+            })
+            return
+        except (KeyError, TypeError) as error:
+            # missing params or unknown document
+            logger.warning('Invalid params of %s: %r', message['method'], error)
+            self._send({
+                'id': message['id'],
+                'error': {'code': _invalid_params, 'message': f'Invalid params: {error!r}'},
+            })
+            return
+        except Exception as error:
+            logger.exception('%s failed', message['method'])
+            self._send({
+                'id': message['id'],
+                'error': {'code': _internal_error, 'message': repr(error)},
+            })
+            return
+        self._send({'id': message['id'], 'result': result})
+
+    def _cancel_request(self, params: dict):
+        task = self._requests.get(params['id'])
+        if task is not None:
+            task.cancel()
+
+    async def _initialize(self, params: dict) -> dict:
+        return {
+            'capabilities': {
+                # full document on every change, the lexer reruns over it anyway
+                'textDocumentSync': 1,
+                'semanticTokensProvider': {
+                    'legend': {'tokenTypes': semantic_token_types, 'tokenModifiers': []},
+                    'full': {'delta': True},
+                },
+            },
+            'serverInfo': {'name': 'c_compiler'},
+        }
+
+    async def _shutdown_request(self, params: dict):
+        self._shutdown = True
+        return None
+
+    def _did_open(self, params: dict):
+        item = params['textDocument']
+        document = Document(item['uri'], item['version'], item['text'])
+        self.documents[document.uri] = document
+        self._schedule(document, 0)
+
+    def _did_change(self, params: dict):
+        document = self.documents[params['textDocument']['uri']]
+        document.version = params['textDocument']['version']
+        document.text = params['contentChanges'][-1]['text']
+        self._schedule(document, self.debounce)
+
+    def _did_close(self, params: dict):
+        document = self.documents.pop(params['textDocument']['uri'])
+        if document.task is not None:
+            document.task.cancel()
+        if document.diagnostics:
+            self._send({
+                'method': 'textDocument/publishDiagnostics',
+                'params': {'uri': document.uri, 'diagnostics': []},
+            })
+
+    def _schedule(self, document: Document, delay: float):
+        # newer edit makes running analysis useless
+        if document.task is not None:
+            document.task.cancel()
+        document.task = asyncio.create_task(
+            self._analyze(document, document.version, document.text, delay)
+        )
+
+    async def _analyze(self, document: Document, version: int, text: str, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        loop = asyncio.get_running_loop()
+        tokens, diagnostics = await loop.run_in_executor(self.executor, analyze, text)
+        if document.version != version:
+            return
+        logger.debug('Analyzed %s version %d', document.uri, version)
+        if tokens is not None:
+            document.tokens = tokens
+        if diagnostics != document.diagnostics:
+            document.diagnostics = diagnostics
+            self._send({
+                'method': 'textDocument/publishDiagnostics',
+                'params': {'uri': document.uri, 'version': version, 'diagnostics': diagnostics},
+            })
+
+    async def _analyzed(self, uri: str) -> Document:
+        document = self.documents[uri]
+        # task gets replaced when it's cancelled by newer edit, wait for the latest one
+        while document.task is not None and not document.task.done():
+            await asyncio.wait({document.task})
+        return document
+
+    async def _semantic_tokens(self, params: dict) -> dict:
+        document = await self._analyzed(params['textDocument']['uri'])
+        document.result_id += 1
+        document.sent_tokens = document.tokens
+        return {'resultId': str(document.result_id), 'data': document.tokens}
+
+    async def _semantic_tokens_delta(self, params: dict) -> dict:
+        document = await self._analyzed(params['textDocument']['uri'])
+        if (
+            document.sent_tokens is None
+            or params.get('previousResultId') != str(document.result_id)
+        ):
+            return await self._semantic_tokens(params)
+        edits = token_edits(document.sent_tokens, document.tokens)
+        document.result_id += 1
+        document.sent_tokens = document.tokens
+        return {'resultId': str(document.result_id), 'edits': edits}
+
+
+async def _serve_stdio(debounce: float) -> int:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    def write(data: bytes):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    # separate processes, so lexing one big file doesn't stall others
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        return await LanguageServer(reader, write, debounce, executor).serve()
+
+
+@click.command()
+@click.option(
+    '--debounce',
+    type=float,
+    default=0.2,
+    show_default=True,
+    help='Seconds to wait after the last edit before analysis',
+)
+@click.option('-v', '--verbose', count=True)
+def main(debounce, verbose):
+    # stdout belongs to the protocol
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.WARNING,
+        format='%(asctime)s %(levelname)s %(message)s',
+        stream=sys.stderr,
+    )
+    sys.exit(asyncio.run(_serve_stdio(debounce)))
+
+
+if __name__ == '__main__':
+    main()
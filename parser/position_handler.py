@@ -7,7 +7,7 @@ class FileAwarePosition():
     def _get_lines_length(content: str) -> list[int]:
         return [len(line) + 1 for line in content.split('\n')]
 
-    def _get_file_position(self, offset: int) -> str:
+    def _get_line_column(self, offset: int) -> tuple[int, int]:
         if offset > self.total_len:
             raise ValueError(f'Offset {offset} outside of file')
         line_index = 0
@@ -16,10 +16,19 @@ class FileAwarePosition():
                 break
             offset -= line
             line_index += 1
-        return f'{line_index + 1}:{offset + 1}'
+        return line_index + 1, offset + 1
+
+    def _get_file_position(self, offset: int) -> str:
+        line, column = self._get_line_column(offset)
+        return f'{line}:{column}'
 
     def error(self, template: str, *args: int, **kwargs: int):
-        return SyntaxError(self.string(template, *args, **kwargs))
+        error = SyntaxError(self.string(template, *args, **kwargs))
+        # lets tools like the language server point at the error without parsing message
+        positions = list(args) + list(kwargs.values())
+        if positions:
+            error.lineno, error.offset = self._get_line_column(positions[0])
+        return error
 
     def string(self, template: str, *args: int, **kwargs: int):
         pos_args = []
@@ -0,0 +1,299 @@
+import logging
+import os
+from typing import Optional, Union
+
+from .extract_tokens import ExtractTokens, RawToken, TokenType
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Text():
+    __slots__ = [
+        'content',
+        'first_line',
+        'blank',
+        '_tokens',
+    ]
+
+    def __init__(self, content: str, first_line: int, blank: bool):
+        self.content = content
+        self.first_line = first_line
+        # only comments and whitespace, known without lexing
+        self.blank = blank
+        self._tokens: Optional[list[RawToken]] = None
+
+    def tokens(self) -> list[RawToken]:
+        # inactive branches are never lexed, they may contain anything
+        if self._tokens is None:
+            self._tokens = [
+                RawToken(token.data, _shift(token.src_pos, self.first_line), token.type)
+                for token in ExtractTokens(self.content).extract()
+            ]
+        return self._tokens
+
+
+class _Directive():
+    __slots__ = [
+        'name',
+        'argument',
+        'line',
+    ]
+
+    def __init__(self, name: str, argument: str, line: int):
+        self.name = name
+        self.argument = argument
+        self.line = line
+
+
+class Header():
+    __slots__ = [
+        'path',
+        'items',
+        'guard',
+        'pragma_once',
+        'signature',
+    ]
+
+    def __init__(
+        self,
+        path: str,
+        items: list[Union[_Text, _Directive]],
+        signature: Optional[tuple[int, int]] = None,
+    ):
+        self.path = path
+        self.items = items
+        # (mtime_ns, size) of the file taken before it was read, so an edit
+        # made while reading makes the header look stale, not fresh
+        self.signature = signature
+        self.pragma_once = any(
+            isinstance(item, _Directive) and item.name == 'pragma' and item.argument == 'once'
+            for item in items
+        )
+        self.guard = self._find_guard(items)
+
+    @staticmethod
+    def _find_guard(items: list[Union[_Text, _Directive]]) -> Optional[str]:
+        # #ifndef X / #define X ... #endif wrapping the whole file,
+        # only comments and whitespace are allowed outside of it
+        significant = [
+            item for item in items if isinstance(item, _Directive) or not item.blank
+        ]
+        if len(significant) < 3:
+            return None
+        first, second, last = significant[0], significant[1], significant[-1]
+        if not (
+            isinstance(first, _Directive) and first.name == 'ifndef'
+            and isinstance(second, _Directive) and second.name == 'define'
+            and (second.argument.split(maxsplit=1) or [''])[0] == first.argument
+            and isinstance(last, _Directive) and last.name == 'endif'
+        ):
+            return None
+        # the #endif must close the #ifndef, not some inner block
+        depth = 0
+        for item in significant[:-1]:
+            if isinstance(item, _Directive):
+                if item.name in ('ifdef', 'ifndef'):
+                    depth += 1
+                elif item.name == 'else' and depth == 1:
+                    # the #else branch is taken once X is defined,
+                    # so the file is not the same on the second include
+                    return None
+                elif item.name == 'endif':
+                    depth -= 1
+                    if depth == 0:
+                        return None
+        return first.argument
+
+
+def _scan_line(line: str, state: Optional[str]) -> tuple[Optional[str], bool]:
+    # state is the literal a line starts inside of: '*' for a multiline
+    # comment, '"' for a string, the lexer lets both go over line ends.
+    # Returns state at the end of line and whether the line has any code
+    code = False
+    position = 0
+    while position < len(line):
+        if state is not None:
+            end = line.find('*/' if state == '*' else '"', position)
+            if end == -1:
+                return state, code
+            position = end + (2 if state == '*' else 1)
+            state = None
+            continue
+        if line.startswith('//', position):
+            break
+        if line.startswith('/*', position):
+            state = '*'
+            position += 2
+            continue
+        symbol = line[position]
+        if not symbol.isspace():
+            code = True
+        if symbol == '"':
+            state = '"'
+        elif symbol == '\'':
+            # char constants are always three symbols long
+            position += 2
+        position += 1
+    return state, code
+
+
+def _shift(src_pos: tuple[str, str], first_line: int) -> tuple[str, ...]:
+    result = []
+    for position in src_pos:
+        line, column = position.split(':')
+        result.append(f'{int(line) + first_line - 1}:{column}')
+    return tuple(result)
+
+
+class Preprocessor():
+    def __init__(
+        self,
+        path: str,
+        include_dirs: tuple[str, ...] = (),
+        cache: Optional[dict[str, Header]] = None,
+        defines: Optional[dict[str, list[RawToken]]] = None,
+    ):
+        self.path = path
+        self.include_dirs = include_dirs
+        # shared between runs over the files of one build
+        self.cache: dict[str, Header] = {} if cache is None else cache
+        self.defines: dict[str, list[RawToken]] = {} if defines is None else dict(defines)
+        self._included: set[str] = set()
+        self._include_stack: list[str] = []
+
+    def process(self) -> list[RawToken]:
+        result: list[RawToken] = []
+        self._process_file(os.path.abspath(self.path), result)
+        return result
+
+    def _load(self, path: str) -> Header:
+        header = self.cache.get(path)
+        if header is None:
+            logger.debug('Reading %s', path)
+            with open(path) as f:
+                stat = os.fstat(f.fileno())
+                header = Header(
+                    path, self._split(f.read(), path), (stat.st_mtime_ns, stat.st_size)
+                )
+            # only included files are shared, the file being compiled is
+            # rarely read again and would grow a long lived cache forever
+            if path != os.path.abspath(self.path):
+                self.cache[path] = header
+        return header
+
+    @staticmethod
+    def _split(content: str, path: str) -> list[Union[_Text, _Directive]]:
+        items: list[Union[_Text, _Directive]] = []
+        text: list[str] = []
+        text_start = 1
+        blank = True
+        state: Optional[str] = None
+        lines = content.split('\n')
+        for index, line in enumerate(lines):
+            stripped = line.strip()
+            if state is not None or not stripped.startswith('#'):
+                # '#' inside of a comment or a string is not a directive
+                text.append(line)
+                state, code = _scan_line(line, state)
+                blank = blank and not code
+                continue
+            if text:
+                items.append(_Text('\n'.join(text) + '\n', text_start, blank))
+            text = []
+            text_start = index + 2
+            blank = True
+            name, _, argument = stripped[1:].strip().partition(' ')
+            if not name:
+                raise SyntaxError(f'Empty directive at {path}:{index + 1}')
+            items.append(_Directive(name, argument.strip(), index + 1))
+        if text:
+            items.append(_Text('\n'.join(text), text_start, blank))
+        return items
+
+    def _process_file(self, path: str, result: list[RawToken]):
+        header = self._load(path)
+        if header.pragma_once and path in self._included:
+            logger.debug('Skipping %s, #pragma once', path)
+            return
+        if header.guard is not None and header.guard in self.defines:
+            logger.debug('Skipping %s, guarded by %s', path, header.guard)
+            return
+        if path in self._include_stack:
+            raise SyntaxError(f'Recursive include of {path}')
+        self._included.add(path)
+        self._include_stack.append(path)
+
+        # each entry tells whether enclosing branch is taken
+        active: list[bool] = []
+        for item in header.items:
+            enabled = all(active)
+            if isinstance(item, _Text):
+                if enabled:
+                    for token in item.tokens():
+                        self._expand(token, result, frozenset())
+                continue
+
+            if item.name in ('ifdef', 'ifndef'):
+                active.append((item.argument in self.defines) == (item.name == 'ifdef'))
+            elif item.name == 'else':
+                if not active:
+                    raise SyntaxError(f'#else without #ifdef at {path}:{item.line}')
+                active[-1] = not active[-1]
+            elif item.name == 'endif':
+                if not active:
+                    raise SyntaxError(f'#endif without #ifdef at {path}:{item.line}')
+                active.pop()
+            elif not enabled:
+                continue
+            elif item.name == 'define':
+                self._define(item, path)
+            elif item.name == 'undef':
+                self.defines.pop(item.argument, None)
+            elif item.name == 'include':
+                self._process_file(self._resolve(item, path), result)
+            elif item.name == 'pragma':
+                continue
+            else:
+                raise SyntaxError(f'Unknown directive #{item.name} at {path}:{item.line}')
+        if active:
+            raise SyntaxError(f'#ifdef was never closed in {path}')
+        self._include_stack.pop()
+
+    def _define(self, directive: _Directive, path: str):
+        name, _, value = directive.argument.partition(' ')
+        if '(' in name:
+            raise SyntaxError(f'Function-like macros are not supported at {path}:{directive.line}')
+        if not name.isidentifier():
+            raise SyntaxError(f'Invalid macro name "{name}" at {path}:{directive.line}')
+        self.defines[name] = [
+            token for token in ExtractTokens(value).extract()
+            if token.type != TokenType.COMMENT
+        ]
+
+    def _resolve(self, directive: _Directive, path: str) -> str:
+        argument = directive.argument
+        if len(argument) < 2 or argument[0] != '"' or argument[-1] != '"':
+            raise SyntaxError(
+                f'Only #include "..." is supported at {path}:{directive.line}'
+            )
+        name = argument[1:-1]
+        for directory in (os.path.dirname(path),) + tuple(self.include_dirs):
+            candidate = os.path.abspath(os.path.join(directory, name))
+            if candidate in self.cache or os.path.isfile(candidate):
+                return candidate
+        raise SyntaxError(f'Can\'t find "{name}" included at {path}:{directive.line}')
+
+    def _expand(self, token: RawToken, result: list[RawToken], hidden: frozenset[str]):
+        if token.type != TokenType.IDENTIFIER or token.data not in self.defines or (
+            token.data in hidden
+        ):
+            result.append(token)
+            return
+        # replacement tokens take position of the macro use
+        for replacement in self.defines[token.data]:
+            self._expand(
+                RawToken(replacement.data, token.src_pos, replacement.type),
+                result,
+                hidden | {token.data},
+            )
@@ -0,0 +1,167 @@
+import click
+import contextlib
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from parser_client import default_socket_path
+
+from .__main__ import main as cli
+from .preprocessor import Header
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompileServer():
+    # pre-forked workers accept connections from one listening socket,
+    # each keeps its own warm header cache between requests
+    def __init__(self, socket_path: str, workers: int = 1):
+        self.socket_path = socket_path
+        self.workers = workers
+        self.header_cache: dict[str, Header] = {}
+        self._children: list[int] = []
+
+    def serve_forever(self):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(128)
+        logger.info('Listening on %s with %d workers', self.socket_path, self.workers)
+        try:
+            if self.workers <= 1:
+                self._work(listener)
+                return
+            for _ in range(self.workers):
+                pid = os.fork()
+                if pid == 0:
+                    # worker must never get to the cleanup below, it belongs to parent
+                    try:
+                        signal.signal(signal.SIGINT, signal.SIG_DFL)
+                        self._work(listener)
+                    finally:
+                        os._exit(1)
+                self._children.append(pid)
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            for _ in self._children:
+                os.wait()
+        finally:
+            for pid in self._children:
+                with contextlib.suppress(ProcessLookupError):
+                    os.kill(pid, signal.SIGTERM)
+            listener.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+    def _work(self, listener: socket.socket):
+        while True:
+            connection, _ = listener.accept()
+            with connection:
+                try:
+                    self._serve_connection(connection)
+                except OSError:
+                    logger.exception('Connection failed')
+
+    def _serve_connection(self, connection: socket.socket):
+        chunks = []
+        while True:
+            chunk = connection.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        try:
+            response = self.handle(json.loads(b''.join(chunks)))
+        except Exception:
+            logger.exception('Invalid request')
+            response = {'stdout': '', 'stderr': 'Invalid request\n', 'exit_code': 2}
+        connection.sendall(json.dumps(response).encode())
+
+    def handle(self, request: dict) -> dict:
+        # workers are single threaded, so swapping cwd and std streams is safe
+        os.chdir(request['cwd'])
+        self._drop_stale_headers()
+        stdout, stderr = io.StringIO(), io.StringIO()
+        exit_code = 0
+        with (
+            contextlib.redirect_stdout(stdout),
+            contextlib.redirect_stderr(stderr),
+            _cli_logging(),
+        ):
+            try:
+                cli.main(
+                    request['args'],
+                    prog_name='parser',
+                    obj=self.header_cache,
+                    standalone_mode=False,
+                )
+            except click.ClickException as error:
+                error.show()
+                exit_code = error.exit_code
+            except click.exceptions.Exit as error:
+                exit_code = error.exit_code
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+        return {'stdout': stdout.getvalue(), 'stderr': stderr.getvalue(), 'exit_code': exit_code}
+
+    def _drop_stale_headers(self):
+        for path, header in list(self.header_cache.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.header_cache[path]
+                continue
+            if header.signature != (stat.st_mtime_ns, stat.st_size):
+                del self.header_cache[path]
+
+
+@contextlib.contextmanager
+def _cli_logging():
+    # root logger without handlers, so logging.basicConfig of the cli installs
+    # its own handler on the redirected stderr with the level it was asked for,
+    # exactly as in a separate process. Server's handlers come back afterwards
+    root = logging.getLogger()
+    handlers, level = root.handlers, root.level
+    root.handlers = []
+    try:
+        yield
+    finally:
+        for handler in root.handlers:
+            handler.close()
+        root.handlers = handlers
+        root.setLevel(level)
+
+
+@click.command()
+@click.option(
+    '-s',
+    '--socket',
+    'socket_path',
+    type=click.Path(dir_okay=False),
+    default=default_socket_path,
+    show_default='$C_COMPILER_SOCKET or $XDG_RUNTIME_DIR/c_compiler-UID.sock',
+)
+@click.option(
+    '-j',
+    '--workers',
+    type=int,
+    default=os.cpu_count(),
+    show_default=True,
+    help='Number of worker processes',
+)
+def main(socket_path, workers):
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s %(message)s',
+    )
+    CompileServer(socket_path, workers).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
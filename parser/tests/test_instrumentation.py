@@ -0,0 +1,55 @@
+import json
+
+from click.testing import CliRunner
+
+from ..__main__ import main
+from ..extract_tokens import ExtractTokens
+from ..instrumentation import Stats, stats
+
+
+def test_disabled_stats_are_not_collected():
+    stats.reset()
+    ExtractTokens('int a;').extract()
+    assert stats.counters == {}
+
+
+def test_extractor_counters():
+    stats.reset()
+    stats.enabled = True
+    try:
+        tokens = ExtractTokens('int a = 0x10; // ф\n').extract()
+    finally:
+        stats.enabled = False
+    counters = stats.as_dict()
+    stats.reset()
+
+    assert counters['stage.extract']['calls'] == 1
+    assert counters['stage.extract']['hits'] == len(tokens) == 6
+    # bytes, not characters
+    assert counters['stage.extract']['bytes'] == 20
+    assert counters['extractor._extract_comment']['bytes'] == 6
+    assert counters['extractor._extract_identifier']['hits'] == 2
+    assert counters['extractor._extract_identifier']['bytes'] == 4
+    assert counters['extractor._extract_number']['bytes'] == 4
+    assert counters['extractor._extract_comment']['calls'] == 10
+    assert counters['position.convert']['calls'] == 6
+
+
+def test_stage():
+    local = Stats()
+    with local.stage('disabled') as counter:
+        assert counter is None
+    local.enabled = True
+    with local.stage('parse', 10):
+        pass
+    assert local.as_dict()['stage.parse']['bytes'] == 10
+    assert local.report().splitlines()[1].startswith('stage.parse')
+
+
+def test_cli_stats(tmp_path):
+    source = tmp_path / 'main.c'
+    source.write_text('int a; // ф\n')
+    result = CliRunner().invoke(main, ['--stats-json', '-', str(source)])
+    assert result.exit_code == 0
+    counters = json.loads(result.output[result.output.index('{'):])
+    assert counters['stage.preprocess']['bytes'] == source.stat().st_size == 13
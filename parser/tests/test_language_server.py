@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+from ..extract_tokens import RawToken, TokenType
+from ..language_server import LanguageServer, encode_tokens, token_edits
+
+
+def _frame(message: dict) -> bytes:
+    body = json.dumps(message).encode()
+    return f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+
+
+def _parse(output: bytes) -> list[dict]:
+    result = []
+    while output:
+        header, _, output = output.partition(b'\r\n\r\n')
+        length = int(header.split(b':')[1])
+        result.append(json.loads(output[:length]))
+        output = output[length:]
+    return result
+
+
+def test_encode_tokens():
+    tokens = [
+        RawToken('int', ('1:1', '1:3'), TokenType.IDENTIFIER),
+        RawToken('a', ('1:5', '1:5'), TokenType.IDENTIFIER),
+        RawToken('/* x\ny */', ('2:3', '3:4'), TokenType.COMMENT),
+        RawToken('1', ('3:6', '3:6'), TokenType.DEC_INT_CONST),
+    ]
+    assert encode_tokens(tokens) == [
+        0, 0, 3, 0, 0,
+        0, 4, 1, 1, 0,
+        1, 2, 4, 3, 0,
+        1, 0, 4, 3, 0,
+        0, 5, 1, 4, 0,
+    ]
+
+
+def test_token_edits():
+    assert token_edits([1, 2, 3], [1, 2, 3]) == []
+    assert token_edits([1, 2, 3], [1, 5, 3]) == [{'start': 1, 'deleteCount': 1, 'data': [5]}]
+    assert token_edits([1, 2], [1, 2, 3]) == [{'start': 2, 'deleteCount': 0, 'data': [3]}]
+    assert token_edits([1, 1, 1], [1, 1]) == [{'start': 2, 'deleteCount': 1, 'data': []}]
+
+
+async def _session(messages: list[dict], debounce: float = 0.01) -> tuple[list[dict], int]:
+    reader = asyncio.StreamReader()
+    output = bytearray()
+    server = LanguageServer(reader, output.extend, debounce)
+    serving = asyncio.create_task(server.serve())
+    for message in messages:
+        if 'sleep' in message:
+            await asyncio.sleep(message['sleep'])
+            continue
+        reader.feed_data(_frame(message))
+        await asyncio.sleep(0)
+    reader.feed_eof()
+    exit_code = await serving
+    return _parse(bytes(output)), exit_code
+
+
+def _open(uri, text):
+    return {
+        'method': 'textDocument/didOpen',
+        'params': {'textDocument': {'uri': uri, 'version': 1, 'text': text}},
+    }
+
+
+def _change(uri, version, text):
+    return {
+        'method': 'textDocument/didChange',
+        'params': {
+            'textDocument': {'uri': uri, 'version': version},
+            'contentChanges': [{'text': text}],
+        },
+    }
+
+
+def _tokens(request_id, uri, previous=None):
+    if previous is None:
+        return {
+            'id': request_id,
+            'method': 'textDocument/semanticTokens/full',
+            'params': {'textDocument': {'uri': uri}},
+        }
+    return {
+        'id': request_id,
+        'method': 'textDocument/semanticTokens/full/delta',
+        'params': {'textDocument': {'uri': uri}, 'previousResultId': previous},
+    }
+
+
+def test_session():
+    responses, exit_code = asyncio.run(_session([
+        {'id': 1, 'method': 'initialize', 'params': {}},
+        _open('file:///a.c', 'int a;'),
+        _open('file:///b.c', 'char b = 0b2;'),
+        _tokens(2, 'file:///a.c'),
+        # edits in a row are debounced, only the last one gets analysed
+        _change('file:///a.c', 2, 'int a = 0x;'),
+        _change('file:///a.c', 3, 'int ab;'),
+        _tokens(3, 'file:///a.c', previous='1'),
+        {'sleep': 0.05},
+        {'id': 4, 'method': 'shutdown'},
+        {'method': 'exit'},
+    ]))
+    assert exit_code == 0
+    by_id = {response['id']: response for response in responses if 'id' in response}
+    assert by_id[1]['result']['capabilities']['semanticTokensProvider']['full'] == {'delta': True}
+    assert by_id[2]['result'] == {
+        'resultId': '1',
+        'data': [0, 0, 3, 0, 0, 0, 4, 1, 1, 0, 0, 1, 1, 2, 0],
+    }
+    assert by_id[3]['result'] == {
+        'resultId': '2',
+        'edits': [{'start': 7, 'deleteCount': 5, 'data': [2, 1, 0, 0, 2]}],
+    }
+
+    diagnostics = [
+        response['params'] for response in responses
+        if response.get('method') == 'textDocument/publishDiagnostics'
+    ]
+    assert diagnostics == [{
+        'uri': 'file:///b.c',
+        'version': 1,
+        'diagnostics': [{
+            'range': {'start': {'line': 0, 'character': 9}, 'end': {'line': 0, 'character': 10}},
+            'severity': 1,
+            'source': 'c_compiler',
+            'message': 'Invelid binary number at 1:10',
+        }],
+    }]
+
+
+def test_unknown_method():
+    responses, exit_code = asyncio.run(_session([{'id': 1, 'method': 'foo'}]))
+    assert exit_code == 1
+    assert responses[0]['error']['code'] == -32601
+
+
+def test_malformed_messages():
+    async def session():
+        reader = asyncio.StreamReader()
+        output = bytearray()
+        serving = asyncio.create_task(LanguageServer(reader, output.extend, 0.01).serve())
+        reader.feed_data(b'Content-Length: 5\r\n\r\n{bad}')
+        reader.feed_data(b'Content-Type: x\r\n\r\n')
+        reader.feed_data(_frame([1, 2]))
+        reader.feed_data(_frame({'id': 1, 'method': 7}))
+        reader.feed_data(_frame({'id': 2, 'method': 'shutdown'}))
+        reader.feed_data(_frame({'method': 'exit'}))
+        exit_code = await serving
+        return _parse(bytes(output)), exit_code
+
+    responses, exit_code = asyncio.run(session())
+    # the server keeps reading after every broken message
+    assert exit_code == 0
+    assert [(response['id'], response.get('error', {}).get('code')) for response in responses] == [
+        (None, -32700), (None, -32700), (None, -32600), (1, -32600), (2, None),
+    ]
+
+
+def test_unknown_document():
+    responses, exit_code = asyncio.run(_session([
+        _change('file:///missing.c', 2, 'int a;'),
+        {'method': 'textDocument/didClose', 'params': {'textDocument': {'uri': 'file:///x.c'}}},
+        _tokens(1, 'file:///missing.c'),
+        {'id': 2, 'method': 'textDocument/semanticTokens/full', 'params': {}},
+        _open('file:///a.c', 'int a;'),
+        _tokens(3, 'file:///a.c'),
+        {'id': 4, 'method': 'shutdown'},
+        {'method': 'exit'},
+    ]))
+    # bad notifications are dropped, server keeps going
+    assert exit_code == 0
+    by_id = {response['id']: response for response in responses if 'id' in response}
+    assert by_id[1]['error']['code'] == -32602
+    assert by_id[2]['error']['code'] == -32602
+    assert by_id[3]['result']['data'] == [0, 0, 3, 0, 0, 0, 4, 1, 1, 0, 0, 1, 1, 2, 0]
@@ -0,0 +1,152 @@
+import pytest
+
+from ..extract_tokens import RawToken, TokenType
+from ..preprocessor import Preprocessor
+
+
+def _data(tokens):
+    return [token.data for token in tokens]
+
+
+def test_define_and_ifdef(tmp_path):
+    source = tmp_path / 'main.c'
+    source.write_text(
+        '#define SIZE 10\n'
+        '#define OTHER SIZE\n'
+        'int a = OTHER;\n'
+        '#ifdef MISSING\n'
+        'int b = \'broken;\n'
+        '#else\n'
+        'int c;\n'
+        '#endif\n'
+    )
+    tokens = Preprocessor(str(source)).process()
+    assert _data(tokens) == ['int', 'a', '=', '10', ';', 'int', 'c', ';']
+    assert tokens[3] == RawToken('10', ('3:9', '3:13'), TokenType.DEC_INT_CONST)
+    assert tokens[5] == RawToken('int', ('7:1', '7:3'), TokenType.IDENTIFIER)
+
+
+def test_include_guards(tmp_path, monkeypatch):
+    (tmp_path / 'guarded.h').write_text(
+        '// comment before guard\n'
+        '#ifndef GUARDED_H\n'
+        '#define GUARDED_H\n'
+        'int guarded;\n'
+        '#endif\n'
+    )
+    (tmp_path / 'once.h').write_text('#pragma once\nint once;\n')
+    (tmp_path / 'plain.h').write_text('int plain;\n')
+    source = tmp_path / 'main.c'
+    source.write_text(
+        '#include "guarded.h"\n'
+        '#include "once.h"\n'
+        '#include "plain.h"\n'
+        '#include "guarded.h"\n'
+        '#include "once.h"\n'
+        '#include "plain.h"\n'
+    )
+    cache = {}
+    preprocessor = Preprocessor(str(source), cache=cache)
+    tokens = [token for token in preprocessor.process() if token.type != TokenType.COMMENT]
+    assert _data(tokens) == [
+        'int', 'guarded', ';', 'int', 'once', ';', 'int', 'plain', ';', 'int', 'plain', ';'
+    ]
+    assert cache[str(tmp_path / 'guarded.h')].guard == 'GUARDED_H'
+    assert cache[str(tmp_path / 'once.h')].pragma_once
+    assert cache[str(tmp_path / 'plain.h')].guard is None
+
+    # second run over the same cache doesn't touch the disk for headers
+    opened = []
+    original_open = open
+
+    def tracking_open(path, *args, **kwargs):
+        opened.append(str(path))
+        return original_open(path, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', tracking_open)
+    other = tmp_path / 'other.c'
+    other.write_text('#include "plain.h"\n')
+    assert _data(Preprocessor(str(other), cache=cache).process()) == ['int', 'plain', ';']
+    assert opened == [str(other)]
+
+
+def test_include_dirs(tmp_path):
+    include = tmp_path / 'include'
+    include.mkdir()
+    (include / 'lib.h').write_text('#define VALUE 0x10\n')
+    source = tmp_path / 'main.c'
+    source.write_text('#include "lib.h"\nVALUE\n')
+    tokens = Preprocessor(str(source), include_dirs=(str(include),)).process()
+    assert tokens == [RawToken('0x10', ('2:1', '2:5'), TokenType.HEX_INT_CONST)]
+
+
+def test_errors(tmp_path):
+    source = tmp_path / 'main.c'
+    source.write_text('#include <stdio.h>\n')
+    with pytest.raises(SyntaxError) as syntax_error:
+        Preprocessor(str(source)).process()
+    assert syntax_error.value.msg == f'Only #include "..." is supported at {source}:1'
+
+    source.write_text('#ifdef A\n')
+    with pytest.raises(SyntaxError) as syntax_error:
+        Preprocessor(str(source)).process()
+    assert syntax_error.value.msg == f'#ifdef was never closed in {source}'
+
+    source.write_text('#include "main.c"\n')
+    with pytest.raises(SyntaxError) as syntax_error:
+        Preprocessor(str(source)).process()
+    assert syntax_error.value.msg == f'Recursive include of {source}'
+
+    source.write_text('#define F(x) x\n')
+    with pytest.raises(SyntaxError) as syntax_error:
+        Preprocessor(str(source)).process()
+    assert syntax_error.value.msg == f'Function-like macros are not supported at {source}:1'
+
+    source.write_text('#ifndef X\n#define\nint a;\n#endif\n')
+    with pytest.raises(SyntaxError) as syntax_error:
+        Preprocessor(str(source)).process()
+    assert syntax_error.value.msg == f'Invalid macro name "" at {source}:2'
+
+
+def test_guard_with_else(tmp_path):
+    (tmp_path / 'h.h').write_text(
+        '#ifndef H\n'
+        '#define H\n'
+        'int first;\n'
+        '#else\n'
+        'int second;\n'
+        '#endif\n'
+    )
+    source = tmp_path / 'main.c'
+    source.write_text('#include "h.h"\n#include "h.h"\n')
+    cache = {}
+    tokens = Preprocessor(str(source), cache=cache).process()
+    assert _data(tokens) == ['int', 'first', ';', 'int', 'second', ';']
+    assert cache[str(tmp_path / 'h.h')].guard is None
+
+
+def test_hash_in_comments_and_strings(tmp_path):
+    source = tmp_path / 'main.c'
+    source.write_text(
+        '/*\n'
+        '#note\n'
+        '*/\n'
+        'char *s = "a\n'
+        '#b";\n'
+        '#define A 1\n'
+        'A\n'
+    )
+    tokens = Preprocessor(str(source)).process()
+    assert _data(token for token in tokens if token.type != TokenType.COMMENT) == [
+        'char', '*', 's', '=', '"a\n#b"', ';', '1'
+    ]
+
+
+def test_headers_are_lexed_lazily(tmp_path):
+    source = tmp_path / 'main.c'
+    source.write_text('// comment\n#ifndef A\n#define A\nint a;\n#endif\n')
+    cache = {}
+    preprocessor = Preprocessor(str(source), cache=cache)
+    header = preprocessor._load(str(source))
+    assert header.guard == 'A'
+    assert all(item._tokens is None for item in header.items if hasattr(item, '_tokens'))
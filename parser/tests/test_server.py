@@ -0,0 +1,87 @@
+import logging
+import os
+import threading
+import time
+
+from click.testing import CliRunner
+
+from parser_client import request
+
+from ..__main__ import main
+from ..server import CompileServer
+
+
+def test_handle_matches_cli(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'lib.h').write_text('#pragma once\n#define VALUE 42\n')
+    (tmp_path / 'main.c').write_text('#include "lib.h"\nint a = VALUE;\n')
+    (tmp_path / 'bad.c').write_text('int a = 0b2;\n')
+    server = CompileServer(str(tmp_path / 'unused.sock'))
+
+    expected = CliRunner().invoke(main, ['main.c'])
+    response = server.handle({'cwd': str(tmp_path), 'args': ['main.c']})
+    assert response == {'stdout': expected.output, 'stderr': '', 'exit_code': 0}
+    assert str(tmp_path / 'lib.h') in server.header_cache
+    # compiled files themselves are not kept
+    assert str(tmp_path / 'main.c') not in server.header_cache
+
+    response = server.handle({'cwd': str(tmp_path), 'args': ['--no-such-option']})
+    assert response['exit_code'] == 2
+    assert 'No such option' in response['stderr']
+
+    response = server.handle({'cwd': str(tmp_path), 'args': ['bad.c']})
+    assert response['exit_code'] == 1
+    assert response['stderr'].endswith('SyntaxError: Invelid binary number at 1:9\n')
+
+
+def test_handle_logs_to_client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'main.c').write_text('int a;\n')
+    server = CompileServer(str(tmp_path / 'unused.sock'))
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+
+    response = server.handle({'cwd': str(tmp_path), 'args': ['-vv', 'main.c']})
+    assert ' DEBUG ' in response['stderr']
+    assert 'Reading' in response['stderr']
+    assert server.handle({'cwd': str(tmp_path), 'args': ['main.c']})['stderr'] == ''
+    assert root.handlers == handlers
+    assert root.level == level
+
+
+def test_stale_headers_are_dropped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    header = tmp_path / 'lib.h'
+    header.write_text('#define VALUE 1\n')
+    (tmp_path / 'main.c').write_text('#include "lib.h"\nVALUE\n')
+    server = CompileServer(str(tmp_path / 'unused.sock'))
+    assert '"1"' in server.handle({'cwd': str(tmp_path), 'args': ['main.c']})['stdout']
+
+    header.write_text('#define VALUE 2\n')
+    # make sure mtime changes even on filesystems with coarse timestamps
+    stat = header.stat()
+    os.utime(header, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert '"2"' in server.handle({'cwd': str(tmp_path), 'args': ['main.c']})['stdout']
+
+    # same mtime, but the size tells the file was changed
+    stat = header.stat()
+    header.write_text('#define VALUE 10\n')
+    os.utime(header, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert '"10"' in server.handle({'cwd': str(tmp_path), 'args': ['main.c']})['stdout']
+
+
+def test_client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'main.c').write_text('int main() {}\n')
+    socket_path = str(tmp_path / 'server.sock')
+    threading.Thread(
+        target=CompileServer(socket_path, workers=1).serve_forever, daemon=True
+    ).start()
+    for _ in range(100):
+        try:
+            response = request(['main.c'], socket_path)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.01)
+    assert response['exit_code'] == 0
+    assert response['stdout'] == CliRunner().invoke(main, ['main.c']).output
@@ -0,0 +1,48 @@
+# Thin client for parser.server, deliberately imports only what is needed
+# to talk to the socket so startup stays in a few milliseconds.
+# Usage is the same as `python -m parser`: python parser_client.py [OPTIONS] FILES
+import json
+import os
+import socket
+import sys
+
+
+def default_socket_path() -> str:
+    return os.environ.get(
+        'C_COMPILER_SOCKET',
+        os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), f'c_compiler-{os.getuid()}.sock'),
+    )
+
+
+def request(args: list[str], socket_path: str) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps({'cwd': os.getcwd(), 'args': args}).encode())
+        connection.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = connection.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b''.join(chunks))
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        response = request(args, default_socket_path())
+    except (FileNotFoundError, ConnectionRefusedError):
+        # no server running, do the work in process
+        os.environ['PYTHONPATH'] = os.pathsep.join(
+            [os.path.dirname(os.path.abspath(__file__))]
+            + [path for path in [os.environ.get('PYTHONPATH')] if path]
+        )
+        os.execv(sys.executable, [sys.executable, '-m', 'parser'] + args)
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    sys.exit(response['exit_code'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from .c_types import CType  # noqa
+from .symbol_table import SymbolTable  # noqa
+from .type_checker import TypeChecker  # noqa
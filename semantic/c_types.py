@@ -0,0 +1,142 @@
+import enum
+from typing import Optional
+
+
+TypeKind = enum.Enum(
+    'TypeKind',
+    [
+        'VOID',
+        'CHAR',
+        'INT',
+        'UNSIGNED_INT',
+        'FLOAT',
+        'POINTER',
+        'FUNCTION',
+    ]
+)
+
+# wider kinds win in arithmetic, same order as usual arithmetic conversions
+_arithmetic_rank = {
+    TypeKind.CHAR: 0,
+    TypeKind.INT: 1,
+    TypeKind.UNSIGNED_INT: 2,
+    TypeKind.FLOAT: 3,
+}
+
+
+class CType():
+    # canonical type, instances are interned so types are compared with `is`
+    __slots__ = [
+        'kind',
+        'pointee',
+        'args',
+    ]
+
+    _interned: dict[tuple, 'CType'] = {}
+
+    def __new__(
+        cls,
+        kind: TypeKind,
+        pointee: Optional['CType'] = None,
+        args: tuple['CType', ...] = (),
+    ):
+        key = (kind, pointee, args)
+        instance = cls._interned.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.kind = kind
+            instance.pointee = pointee
+            instance.args = args
+            cls._interned[key] = instance
+        return instance
+
+    def __reduce__(self):
+        # keeps types interned when they travel between processes
+        return CType, (self.kind, self.pointee, self.args)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self) -> str:
+        if self.kind == TypeKind.POINTER:
+            return f'{self.pointee!r} *'
+        if self.kind == TypeKind.FUNCTION:
+            return f'{self.pointee!r} ({", ".join(map(repr, self.args))})'
+        return self.kind.name.lower()
+
+    @property
+    def is_pointer(self) -> bool:
+        return self.kind == TypeKind.POINTER
+
+    @property
+    def is_integer(self) -> bool:
+        return self.kind in (TypeKind.CHAR, TypeKind.INT, TypeKind.UNSIGNED_INT)
+
+    @property
+    def is_arithmetic(self) -> bool:
+        return self.kind in _arithmetic_rank
+
+    @property
+    def is_scalar(self) -> bool:
+        return self.is_arithmetic or self.is_pointer
+
+
+VOID = CType(TypeKind.VOID)
+CHAR = CType(TypeKind.CHAR)
+INT = CType(TypeKind.INT)
+UNSIGNED_INT = CType(TypeKind.UNSIGNED_INT)
+FLOAT = CType(TypeKind.FLOAT)
+
+
+def pointer_to(pointee: CType) -> CType:
+    return CType(TypeKind.POINTER, pointee)
+
+
+def function_type(return_type: CType, args: tuple[CType, ...]) -> CType:
+    return CType(TypeKind.FUNCTION, return_type, args)
+
+
+def common_type(left: CType, right: CType) -> CType:
+    if _arithmetic_rank[left.kind] >= _arithmetic_rank[right.kind]:
+        return left
+    return right
+
+
+_names_cache: dict[tuple[str, ...], CType] = {}
+
+
+def from_names(names: list[str]) -> CType:
+    # names as stored in Variable.type, e.g. ['unsigned', 'long', 'long', 'int', '*']
+    key = tuple(names)
+    result = _names_cache.get(key)
+    if result is None:
+        result = _names_cache[key] = _parse_names(names)
+    return result
+
+
+def _parse_names(names: list[str]) -> CType:
+    words = [name for name in names if name != '*' and not name.startswith('[')]
+    if not words:
+        raise TypeError(f'No base type in {names}')
+    for word in words:
+        if word not in ('void', 'char', 'int', 'long', 'unsigned', 'float', 'double'):
+            raise TypeError(f'Unknown type name "{word}" in {names}')
+
+    if 'unsigned' in words:
+        result = UNSIGNED_INT
+    elif 'float' in words or 'double' in words:
+        result = FLOAT
+    elif 'char' in words:
+        result = CHAR
+    elif 'void' in words:
+        result = VOID
+    else:
+        result = INT
+    for name in names:
+        # array declarators decay to pointers
+        if name == '*' or name.startswith('['):
+            result = pointer_to(result)
+    return result
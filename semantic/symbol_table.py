@@ -0,0 +1,67 @@
+from typing import Iterator, NamedTuple, Optional
+
+from c_token import Token
+
+from .c_types import CType
+
+
+class Symbol(NamedTuple):
+    name: str
+    type: CType
+    declaration: Token
+
+
+class Scope():
+    # symbols of one block, names of enclosing blocks are found through parent.
+    # Scopes are mutable, declarations after a child is popped go to the same
+    # dict, so a kept scope is not a snapshot of names visible at some point
+    __slots__ = [
+        'parent',
+        'symbols',
+        'depth',
+    ]
+
+    def __init__(self, parent: Optional['Scope'] = None):
+        self.parent = parent
+        self.symbols: dict[str, Symbol] = {}
+        self.depth: int = 0 if parent is None else parent.depth + 1
+
+    def __iter__(self) -> Iterator['Scope']:
+        scope: Optional[Scope] = self
+        while scope is not None:
+            yield scope
+            scope = scope.parent
+
+
+class SymbolTable():
+    def __init__(self):
+        self.scope = Scope()
+
+    def push(self) -> Scope:
+        self.scope = Scope(self.scope)
+        return self.scope
+
+    def pop(self) -> Scope:
+        if self.scope.parent is None:
+            raise ValueError('Can\'t leave global scope')
+        scope = self.scope
+        self.scope = scope.parent
+        return scope
+
+    def declare(self, name: str, symbol_type: CType, declaration: Token) -> Symbol:
+        previous = self.scope.symbols.get(name)
+        if previous is not None:
+            raise TypeError(
+                f'Redeclaration of "{name}" at {declaration.src_pos}, '
+                f'previously declared at {previous.declaration.src_pos}'
+            )
+        symbol = Symbol(name, symbol_type, declaration)
+        self.scope.symbols[name] = symbol
+        return symbol
+
+    def lookup(self, name: str) -> Optional[Symbol]:
+        for scope in self.scope:
+            symbol = scope.symbols.get(name)
+            if symbol is not None:
+                return symbol
+        return None
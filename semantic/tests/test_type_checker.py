@@ -0,0 +1,113 @@
+import pytest
+
+from c_token import (
+    Constant,
+    Function,
+    FunctionCall,
+    OpArity,
+    Operator,
+    OpType,
+    Return,
+    ValType,
+    Variable,
+)
+
+from .. import c_types
+from ..symbol_table import SymbolTable
+from ..type_checker import TypeChecker
+
+
+def test_types_are_interned():
+    assert c_types.from_names(['char', '*']) is c_types.pointer_to(c_types.CHAR)
+    assert c_types.from_names(['unsigned', 'long', 'long', 'int']) is c_types.UNSIGNED_INT
+    assert c_types.from_names(['long', 'long', 'int']) is c_types.INT
+    assert c_types.from_names(['char', '*', '*']) is not c_types.from_names(['char', '*'])
+    with pytest.raises(TypeError):
+        c_types.from_names(['struct'])
+
+
+def test_symbol_table_scopes():
+    table = SymbolTable()
+    declaration = Variable((1, 1), 'a', ['int'])
+    table.declare('a', c_types.INT, declaration)
+    outer = table.scope
+    table.push()
+    table.declare('a', c_types.CHAR, declaration)
+    assert table.lookup('a').type is c_types.CHAR
+    with pytest.raises(TypeError):
+        table.declare('a', c_types.CHAR, declaration)
+    table.pop()
+    assert table.scope is outer
+    assert table.lookup('a').type is c_types.INT
+    assert table.lookup('b') is None
+    with pytest.raises(ValueError):
+        table.pop()
+
+
+def _main(body):
+    return Function((1, 1), ['int'], 'main', [], body)
+
+
+def test_check_expression_types():
+    division = Operator(
+        (2, 1), OpArity.Binary, OpType.DIV,
+        (Variable((2, 2), 'u', ['unsigned']), Constant((2, 3), ValType.INT, 2))
+    )
+    access = Operator(
+        (3, 1), OpArity.Binary, OpType.ARRAY_ACC,
+        (Variable((3, 2), 's', ['char', '*']), Constant((3, 3), ValType.INT, 0))
+    )
+    program = [
+        Function(
+            (0, 1), ['int'], 'twice', [Variable((0, 2), 'x', ['int'])],
+            [Return((0, 3), Variable((0, 4), 'x', ['int']))]
+        ),
+        _main([
+            Variable((1, 2), 'u', ['unsigned'], Constant((1, 3), ValType.INT, 1)),
+            Variable((1, 4), 's', ['char', '*'], Constant((1, 5), ValType.STRING, 'abc')),
+            Variable((1, 6), 'q', ['unsigned'], division),
+            Variable((1, 7), 'c', ['char'], access),
+            Return((1, 8), FunctionCall((1, 9), 'twice', [Variable((1, 10), 'c', ['char'])])),
+        ]),
+    ]
+    types = TypeChecker(program).check()
+    assert types[id(division)] is c_types.UNSIGNED_INT
+    assert types[id(access)] is c_types.CHAR
+
+
+def test_check_errors():
+    deref = Operator((2, 1), OpArity.Unary, OpType.DEREF, Variable((2, 2), 'a', ['int']))
+    with pytest.raises(TypeError, match='Can\'t dereference int'):
+        TypeChecker([_main([Variable((1, 2), 'a', ['int']), deref])]).check()
+
+    with pytest.raises(TypeError, match='Undeclared variable "b"'):
+        TypeChecker([_main([Return((1, 2), Variable((1, 3), 'b', ['int']))])]).check()
+
+    with pytest.raises(TypeError, match='"main" takes 0 arguments, 1 given'):
+        TypeChecker([_main([
+            FunctionCall((1, 2), 'main', [Constant((1, 3), ValType.INT, 1)])
+        ])]).check()
+
+    with pytest.raises(TypeError, match='Can\'t convert char \\* to int'):
+        TypeChecker([_main([
+            Variable((1, 2), 'a', ['int'], Constant((1, 3), ValType.STRING, 'abc'))
+        ])]).check()
+
+    with pytest.raises(TypeError, match='Return with value in void function'):
+        TypeChecker([Function((1, 1), ['void'], 'f', [], [
+            Return((1, 2), Constant((1, 3), ValType.INT, 1))
+        ])]).check()
+
+
+def test_deep_expression():
+    # a + a + ... + a, left nested deeper than the recursion limit
+    chain = Variable((1, 1), 'a', ['int'])
+    for _ in range(5000):
+        chain = Operator(
+            (1, 1), OpArity.Binary, OpType.ADD, (chain, Variable((1, 1), 'a', ['int']))
+        )
+    program = [_main([
+        Variable((2, 1), 'a', ['int'], Constant((2, 2), ValType.INT, 1)),
+        Return((3, 1), chain),
+    ])]
+    assert TypeChecker(program).check()[id(chain)] is c_types.INT
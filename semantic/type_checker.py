@@ -0,0 +1,250 @@
+import logging
+from typing import Optional
+
+from c_token import (
+    Condition,
+    Constant,
+    ForLoop,
+    Function,
+    FunctionCall,
+    Operator,
+    OpType,
+    Return,
+    Token,
+    ValType,
+    Variable,
+    WhileLoop,
+)
+
+from . import c_types
+from .c_types import CType
+from .symbol_table import SymbolTable
+
+
+logger = logging.getLogger(__name__)
+
+
+_constant_types = {
+    ValType.INT: c_types.INT,
+    ValType.UNSIGNED_INT: c_types.UNSIGNED_INT,
+    ValType.CHAR: c_types.CHAR,
+    ValType.FLOAT: c_types.FLOAT,
+    ValType.STRING: c_types.pointer_to(c_types.CHAR),
+}
+
+
+class TypeChecker():
+    def __init__(self, program: list[Token]):
+        self.program = program
+        self.symbols = SymbolTable()
+        # id(expression) -> type, so later stages don't have to infer it again
+        self.expression_types: dict[int, CType] = {}
+        self._return_type: Optional[CType] = None
+
+    def check(self) -> dict[int, CType]:
+        # functions are visible from the whole file, so calls to functions
+        # defined later don't need prototypes
+        for token in self.program:
+            if isinstance(token, Function):
+                self.symbols.declare(token.name, self._function_type(token), token)
+        for token in self.program:
+            if isinstance(token, Function):
+                self._check_function(token)
+            else:
+                self._check_statement(token)
+        return self.expression_types
+
+    @staticmethod
+    def _function_type(function: Function) -> CType:
+        return c_types.function_type(
+            c_types.from_names(function.return_type),
+            tuple(c_types.from_names(arg.type) for arg in function.args),
+        )
+
+    def _check_function(self, function: Function):
+        self._return_type = c_types.from_names(function.return_type)
+        self.symbols.push()
+        for arg in function.args:
+            self._declare(arg)
+        self._check_body(function.body, new_scope=False)
+        self.symbols.pop()
+        self._return_type = None
+
+    def _check_body(self, body: list[Token], new_scope: bool = True):
+        if new_scope:
+            self.symbols.push()
+        for statement in body:
+            self._check_statement(statement)
+        if new_scope:
+            self.symbols.pop()
+
+    def _check_statement(self, statement: Token):
+        if isinstance(statement, Variable):
+            self._declare(statement)
+        elif isinstance(statement, Return):
+            self._check_return(statement)
+        elif isinstance(statement, (Condition, WhileLoop)):
+            self._check_condition(statement.condition)
+            self._check_body(statement.body)
+        elif isinstance(statement, ForLoop):
+            self.symbols.push()
+            if statement.init is not None:
+                self._check_statement(statement.init)
+            if statement.condition is not None:
+                self._check_condition(statement.condition)
+            if statement.increment is not None:
+                self._check_expression(statement.increment)
+            self._check_body(statement.body)
+            self.symbols.pop()
+        elif isinstance(statement, Function):
+            raise TypeError(f'Nested function "{statement.name}" at {statement.src_pos}')
+        else:
+            self._check_expression(statement)
+
+    def _declare(self, variable: Variable):
+        variable_type = c_types.from_names(variable.type)
+        if variable_type is c_types.VOID:
+            raise TypeError(f'Variable "{variable.name}" declared void at {variable.src_pos}')
+        if variable.value is not None:
+            self._check_assignable(
+                variable_type, self._check_expression(variable.value), variable.value
+            )
+        self.symbols.declare(variable.name, variable_type, variable)
+
+    def _check_return(self, statement: Return):
+        if self._return_type is None:
+            raise TypeError(f'Return outside of function at {statement.src_pos}')
+        if statement.value is None:
+            if self._return_type is not c_types.VOID:
+                raise TypeError(f'Return without value at {statement.src_pos}')
+            return
+        if self._return_type is c_types.VOID:
+            raise TypeError(f'Return with value in void function at {statement.src_pos}')
+        self._check_assignable(
+            self._return_type, self._check_expression(statement.value), statement.value
+        )
+
+    def _check_condition(self, condition: Token):
+        if not self._check_expression(condition).is_scalar:
+            raise TypeError(f'Condition at {condition.src_pos} is not scalar')
+
+    def _check_expression(self, expression: Token) -> CType:
+        # iterative post order, operands get their types before operators,
+        # deep expression chains would hit recursion limit
+        stack: list[tuple[Token, bool]] = [(expression, False)]
+        while stack:
+            node, operands_done = stack.pop()
+            if not operands_done:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in reversed(self._operands(node)))
+                continue
+            self.expression_types[id(node)] = self._expression_type(node)
+        return self.expression_types[id(expression)]
+
+    @staticmethod
+    def _operands(expression: Token) -> tuple[Token, ...]:
+        if isinstance(expression, Operator):
+            return expression.args if isinstance(expression.args, tuple) else (expression.args,)
+        if isinstance(expression, FunctionCall):
+            return tuple(expression.args)
+        return ()
+
+    def _type_of(self, expression: Token) -> CType:
+        # only for operands already checked by _check_expression
+        return self.expression_types[id(expression)]
+
+    def _expression_type(self, expression: Token) -> CType:
+        if isinstance(expression, Constant):
+            return _constant_types[expression.type]
+        if isinstance(expression, Variable):
+            symbol = self.symbols.lookup(expression.name)
+            if symbol is None or symbol.type.kind == c_types.TypeKind.FUNCTION:
+                raise TypeError(
+                    f'Undeclared variable "{expression.name}" at {expression.src_pos}'
+                )
+            return symbol.type
+        if isinstance(expression, Operator):
+            return self._check_operator(expression)
+        if isinstance(expression, FunctionCall):
+            return self._check_call(expression)
+        raise TypeError(
+            f'Unexpected {type(expression).__name__} in expression at {expression.src_pos}'
+        )
+
+    def _check_operator(self, operator: Operator) -> CType:
+        if operator.type in (OpType.MUL, OpType.DIV, OpType.ADD, OpType.SUB):
+            left, right = (self._type_of(arg) for arg in operator.args)
+            if not (left.is_arithmetic and right.is_arithmetic):
+                raise TypeError(
+                    f'Invalid operands ({left!r}, {right!r}) for {operator.type.name} '
+                    f'at {operator.src_pos}'
+                )
+            return c_types.common_type(left, right)
+
+        if operator.type == OpType.UNARY_SUB:
+            operand = self._type_of(operator.args)
+            if not operand.is_arithmetic:
+                raise TypeError(f'Invalid operand {operand!r} for - at {operator.src_pos}')
+            return operand
+
+        if operator.type == OpType.REF:
+            operand = self._type_of(operator.args)
+            if not self._is_lvalue(operator.args):
+                raise TypeError(f'Can\'t take address of rvalue at {operator.src_pos}')
+            return c_types.pointer_to(operand)
+
+        if operator.type == OpType.DEREF:
+            operand = self._type_of(operator.args)
+            if not operand.is_pointer or operand.pointee is c_types.VOID:
+                raise TypeError(f'Can\'t dereference {operand!r} at {operator.src_pos}')
+            return operand.pointee
+
+        if operator.type == OpType.ARRAY_ACC:
+            array, index = (self._type_of(arg) for arg in operator.args)
+            if not array.is_pointer or array.pointee is c_types.VOID:
+                raise TypeError(f'Can\'t index {array!r} at {operator.src_pos}')
+            if not index.is_integer:
+                raise TypeError(f'Array index is {index!r} at {operator.src_pos}')
+            return array.pointee
+
+        if operator.type == OpType.ASSIGN:
+            target, value = (self._type_of(arg) for arg in operator.args)
+            if not self._is_lvalue(operator.args[0]):
+                raise TypeError(f'Can\'t assign to rvalue at {operator.src_pos}')
+            self._check_assignable(target, value, operator.args[1])
+            return target
+
+        raise TypeError(f'Unknown operator {operator.type} at {operator.src_pos}')
+
+    def _check_call(self, call: FunctionCall) -> CType:
+        symbol = self.symbols.lookup(call.name)
+        if symbol is None or symbol.type.kind != c_types.TypeKind.FUNCTION:
+            raise TypeError(f'Undeclared function "{call.name}" at {call.src_pos}')
+        if len(symbol.type.args) != len(call.args):
+            raise TypeError(
+                f'"{call.name}" takes {len(symbol.type.args)} arguments, '
+                f'{len(call.args)} given at {call.src_pos}'
+            )
+        for expected, arg in zip(symbol.type.args, call.args):
+            self._check_assignable(expected, self._type_of(arg), arg)
+        return symbol.type.pointee
+
+    @staticmethod
+    def _is_lvalue(expression: Token) -> bool:
+        if isinstance(expression, Variable):
+            return True
+        return isinstance(expression, Operator) and expression.type in (
+            OpType.DEREF, OpType.ARRAY_ACC
+        )
+
+    @staticmethod
+    def _check_assignable(target: CType, value: CType, expression: Token):
+        if target is value:
+            return
+        if target.is_arithmetic and value.is_arithmetic:
+            return
+        if target.is_pointer and value.is_pointer and c_types.VOID in (
+            target.pointee, value.pointee
+        ):
+            return
+        raise TypeError(f'Can\'t convert {value!r} to {target!r} at {expression.src_pos}')